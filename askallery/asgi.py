@@ -3,14 +3,44 @@ ASGI config for askallery project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+It's the production entry point, served by gunicorn with uvicorn workers:
+
+    gunicorn askallery.asgi:application -k uvicorn.workers.UvicornWorker
+
+or by uvicorn alone during development:
+
+    uvicorn askallery.asgi:application --reload
+
+Request bodies are read by the event loop before the views run, and
+each view runs in its own thread, so slow clients and slow uploads
+(e.g. waiting on the picture classifier) don't hold a worker that
+other requests need. Static files are served by WhiteNoise's
+middleware.
+
+ASGI servers can't use `sendfile`, so outside of DEBUG the media
+files must be sent by nginx: either MEDIA_ACCEL_REDIRECT is set or
+SERVE_MEDIA is disabled.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
+from django.core.exceptions import ImproperlyConfigured
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'askallery.settings')
 
 application = get_asgi_application()
+
+if (
+    settings.SERVE_MEDIA
+    and not settings.MEDIA_ACCEL_REDIRECT
+    and not settings.DEBUG
+):
+    raise ImproperlyConfigured(
+        'MEDIA_ACCEL_REDIRECT must be set to serve media under ASGI, '
+        'or SERVE_MEDIA disabled.'
+    )
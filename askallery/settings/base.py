@@ -51,7 +51,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',
@@ -62,6 +62,23 @@ REST_FRAMEWORK = {
 
 AUTH_USER_MODEL = 'users.User'
 
+# Likes
+# Buffer the like counters in the cache and write them with
+# `python manage.py flush_likes` instead of on every request.
+# Ignored unless the default cache is shared by the processes.
+LIKES_WRITE_BEHIND = env.bool('LIKES_WRITE_BEHIND', default=False)
+
+# Timelines
+# Maximum quantity of posts stored in each user's home feed timeline.
+TIMELINE_LENGTH = env.int('TIMELINE_LENGTH', default=800)
+# Posts of users with more followers are not pushed into the
+# followers' timelines, they are merged when the feed is read.
+TIMELINE_FANOUT_LIMIT = env.int('TIMELINE_FANOUT_LIMIT', default=5000)
+# Seconds a timeline is kept before it's rebuilt from the database.
+# Timelines are only kept when the default cache is shared by the
+# processes.
+TIMELINE_TIMEOUT = env.int('TIMELINE_TIMEOUT', default=60 * 60 * 24)
+
 # Application definition
 INSTALLED_APPS = [
 
@@ -188,6 +205,86 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 MEDIA_URL = '/media/'
 
+# Media files stored in MEDIA_ROOT are served by the app when
+# SERVE_MEDIA is set. With MEDIA_ACCEL_REDIRECT set to an nginx
+# internal location (e.g. '/protected-media/'), the app only checks
+# the request and nginx sends the file. It's required to serve media
+# under ASGI outside of DEBUG, see askallery.asgi.
+SERVE_MEDIA = env.bool('SERVE_MEDIA', default=True)
+
+MEDIA_ACCEL_REDIRECT = env('MEDIA_ACCEL_REDIRECT', default='')
+
+# Shared cache
+# Cache backends whose entries are seen by every process and whose
+# add and incr are atomic, which the like buffer, the timelines and
+# the response cache need. They aren't used with other backends.
+SHARED_CACHE_BACKENDS = [
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+]
+
+# Response cache
+# Data of the public endpoints served to anonymous users is cached
+# for RESPONSE_CACHE_TIMEOUT seconds in the RESPONSE_CACHE_ALIAS
+# cache, 0 disables it. It's disabled too when that cache isn't
+# one of the SHARED_CACHE_BACKENDS. Clients and
+# CDNs may cache the responses for RESPONSE_CACHE_MAX_AGE seconds.
+RESPONSE_CACHE_ALIAS = env('RESPONSE_CACHE_ALIAS', default='default')
+
+RESPONSE_CACHE_TIMEOUT = env.int('RESPONSE_CACHE_TIMEOUT', default=300)
+
+RESPONSE_CACHE_MAX_AGE = env.int('RESPONSE_CACHE_MAX_AGE', default=60)
+
+# Asuka pictures classification
+# Classifier backend which decides whether an image is an Asuka
+# picture, posts are published once their image is approved.
+# Its verdicts are cached by perceptual hash.
+ASUKA_CLASSIFIER = env(
+    'ASUKA_CLASSIFIER',
+    default='utils.classification.GoogleSearchClassifier'
+)
+# Seconds a classification can take before it is given up.
+ASUKA_CLASSIFIER_TIMEOUT = env.float('ASUKA_CLASSIFIER_TIMEOUT', default=10)
+ASUKA_VERDICT_CACHE_SIZE = env.int('ASUKA_VERDICT_CACHE_SIZE', default=4096)
+# Seconds
+ASUKA_VERDICT_CACHE_TTL = env.int('ASUKA_VERDICT_CACHE_TTL', default=604800)
+# Bits in which two pictures can differ to share the verdict.
+ASUKA_VERDICT_MAX_DISTANCE = env.int('ASUKA_VERDICT_MAX_DISTANCE', default=4)
+# Posts whose image couldn't be classified stay pending and are
+# retried by `python manage.py publish_pending_posts`.
+ASUKA_CLASSIFICATION_MAX_ATTEMPTS = env.int(
+    'ASUKA_CLASSIFICATION_MAX_ATTEMPTS', default=5
+)
+# Seconds before the first retry, doubled on every attempt.
+ASUKA_CLASSIFICATION_RETRY_DELAY = env.int(
+    'ASUKA_CLASSIFICATION_RETRY_DELAY', default=60
+)
+
+# Users loaded by the JWT authentication, see users.authentication.
+AUTH_USER_CACHE_SIZE = env.int('AUTH_USER_CACHE_SIZE', default=1024)
+# Seconds
+AUTH_USER_CACHE_TTL = env.int('AUTH_USER_CACHE_TTL', default=30)
+# Validated access tokens, kept until they expire at most.
+AUTH_TOKEN_CACHE_SIZE = env.int('AUTH_TOKEN_CACHE_SIZE', default=4096)
+# Seconds
+AUTH_TOKEN_CACHE_TTL = env.int('AUTH_TOKEN_CACHE_TTL', default=300)
+
+# Outbound email queue, see utils.mail.
+EMAIL_QUEUE_BATCH_SIZE = env.int('EMAIL_QUEUE_BATCH_SIZE', default=100)
+EMAIL_QUEUE_MAX_ATTEMPTS = env.int('EMAIL_QUEUE_MAX_ATTEMPTS', default=5)
+# Seconds before the first retry, doubled on every attempt.
+EMAIL_QUEUE_RETRY_DELAY = env.int('EMAIL_QUEUE_RETRY_DELAY', default=60)
+# Seconds a worker has to send a claimed batch.
+EMAIL_QUEUE_LEASE = env.int('EMAIL_QUEUE_LEASE', default=300)
+
+# Quantity of threads which compress the uploaded images.
+# With 0 the images are compressed during the request.
+IMAGE_PROCESSING_WORKERS = env.int('IMAGE_PROCESSING_WORKERS', default=2)
+# Model which counts the references to each stored image rendition,
+# see utils.images.
+IMAGE_BLOB_MODEL = 'posts.ImageBlob'
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
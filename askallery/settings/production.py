@@ -51,9 +51,25 @@ DATABASES = {
     }
 }
 
+# Cache
+# The like buffer, the timelines and the response cache are only
+# used when it's one of the SHARED_CACHE_BACKENDS, e.g. Redis.
+CACHES = {
+    'default': {
+        'BACKEND': env(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': env('CACHE_LOCATION', default=''),
+    }
+}
+
 # Media
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
+# The media files are served by Cloudinary.
+SERVE_MEDIA = env.bool('SERVE_MEDIA', default=False)
+
 CLOUDINARY_STORAGE = {
   'CLOUD_NAME': env('CLOUD_NAME'),
   'API_KEY': env('API_KEY'),
@@ -9,13 +9,19 @@ SECRET_KEY = env("DJANGO_SECRET_KEY", default="7lEaACt4wsCj8JbXYgQLf4BmdG5QbuHTM
 TEST_RUNNER = "django.test.runner.DiscoverRunner"
 
 # Cache
+# The tests run in a single process and the local memory cache
+# locks its add and incr, so it stands for production's shared one.
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": ""
     }
 }
 
+SHARED_CACHE_BACKENDS = [
+    *SHARED_CACHE_BACKENDS,  # NOQA
+    "django.core.cache.backends.locmem.LocMemCache",
+]
+
 # Passwords
 PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
 
@@ -40,5 +46,9 @@ EMAIL_PORT = 1025
 # Storage
 # DEFAULT_FILE_STORAGE = 'inmemorystorage.InMemoryStorage'
 
+# Classification
+ASUKA_CLASSIFIER = 'utils.tests.FakeClassifier'
+
 # Media
 MEDIA_ROOT = tempfile.mkdtemp()
+IMAGE_PROCESSING_WORKERS = 0
@@ -4,7 +4,9 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+# Utils
+from utils.media import serve_media
 
 urlpatterns = [
 
@@ -17,4 +19,13 @@ urlpatterns = [
     # Posts
     path('api/', include(('posts.urls', 'posts'), namespace='posts')),
 
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        path(
+            '{}<path:path>'.format(settings.MEDIA_URL.lstrip('/')),
+            serve_media,
+            name='media'
+        ),
+    ]
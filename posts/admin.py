@@ -4,8 +4,9 @@
 from django.contrib import admin
 
 # Models
-from posts.models import Post, Comment
+from posts.models import Post, Comment, ImageBlob
 
 
 admin.site.register(Post)
-admin.site.register(Comment)
\ No newline at end of file
+admin.site.register(Comment)
+admin.site.register(ImageBlob)
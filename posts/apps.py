@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'posts'
+
+    def ready(self):
+        """Invalidates the cached responses when the models change."""
+        from posts.models import Post
+        from utils.caching import invalidate_on_save
+        post_save.connect(invalidate_on_save, sender=Post)
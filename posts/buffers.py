@@ -0,0 +1,194 @@
+"""Write-behind buffer for like counters.
+
+When `LIKES_WRITE_BEHIND` is enabled, like and unlike deltas of
+posts and comments are accumulated in the default cache instead of
+updating the `likes_quantity` column on every request.
+`flush_likes` (run by the `flush_likes` management command) writes
+the accumulated deltas with one UPDATE statement per model.
+
+Every delta is also registered under an increasing sequence number,
+so the flusher knows which objects are dirty without needing a
+set type in the cache backend. A writer takes its number before it
+registers the object, so the flusher stops at the first missing
+number until it appears, or for `SLOT_GRACE` seconds when its
+writer died meanwhile.
+
+Deltas which are flushed down to zero expire after `DELTA_TIMEOUT`
+seconds, a like made meanwhile is written by the next flush.
+
+The flusher runs in another process, so the buffer is only enabled
+when the default cache is shared by the processes.
+"""
+
+# Django
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+# Utils
+from utils.caching import is_shared_cache
+import time
+
+
+KEY_PREFIX = 'likes_delta'
+SEQUENCE_KEY = '{}:seq'.format(KEY_PREFIX)
+FLUSHED_SEQUENCE_KEY = '{}:flushed_seq'.format(KEY_PREFIX)
+SLOT_GRACE = 60
+DELTA_TIMEOUT = 60 * 60 * 24
+
+
+def is_enabled():
+    """Returns whether like counters are buffered."""
+    return (
+        getattr(settings, 'LIKES_WRITE_BEHIND', False)
+        and is_shared_cache()
+    )
+
+
+def _delta_key(label, pk):
+    return '{}:{}:{}'.format(KEY_PREFIX, label, pk)
+
+
+def _dirty_key(sequence):
+    return '{}:dirty:{}'.format(KEY_PREFIX, sequence)
+
+
+def _missing_key(sequence):
+    return '{}:missing:{}'.format(KEY_PREFIX, sequence)
+
+
+def _is_lost_slot(sequence):
+    """Returns whether the writer of the given sequence number
+    didn't register its object within `SLOT_GRACE` seconds.
+    """
+    key = _missing_key(sequence)
+    cache.add(key, time.time(), timeout=SLOT_GRACE * 2)
+    return time.time() - cache.get(key, time.time()) >= SLOT_GRACE
+
+
+def add_likes_delta(instance, delta):
+    """Accumulates a 'likes_quantity' delta for the given instance."""
+    label = instance._meta.label_lower
+    key = _delta_key(label, instance.pk)
+    cache.add(key, 0, timeout=None)
+    cache.incr(key, delta)
+
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    sequence = cache.incr(SEQUENCE_KEY)
+    cache.set(_dirty_key(sequence), (label, instance.pk), timeout=None)
+
+
+def get_pending_likes(instance):
+    """Returns the 'likes_quantity' delta of the given
+    instance which has not been flushed yet.
+    """
+    if not is_enabled():
+        return 0
+    pending = getattr(instance, 'pending_likes', None)
+    if pending is not None:
+        return pending
+    key = _delta_key(instance._meta.label_lower, instance.pk)
+    return cache.get(key, 0)
+
+
+def prefetch_pending_likes(instances):
+    """Reads the pending deltas of the given instances at once
+    and stores them in their `pending_likes` attribute.
+    """
+    if not is_enabled() or not instances:
+        return
+    keys = [
+        _delta_key(instance._meta.label_lower, instance.pk)
+        for instance in instances
+    ]
+    deltas = cache.get_many(keys)
+    for instance, key in zip(instances, keys):
+        instance.pending_likes = deltas.get(key, 0)
+
+
+def get_pending_deltas(model, pks):
+    """Returns the pending 'likes_quantity' deltas of the
+    given rows keyed by pk, leaving out the rows without one.
+    """
+    if not is_enabled() or not pks:
+        return {}
+    label = model._meta.label_lower
+    keys = {_delta_key(label, pk): pk for pk in pks}
+    return {
+        keys[key]: delta
+        for key, delta in cache.get_many(list(keys)).items()
+        if delta
+    }
+
+
+def flush_likes(batch_size=500):
+    """Writes the buffered deltas to the database.
+
+    Returns the number of updated rows.
+    """
+    flushed = cache.get(FLUSHED_SEQUENCE_KEY, 0)
+    current = cache.get(SEQUENCE_KEY, 0)
+    updated = 0
+
+    for start in range(flushed + 1, current + 1, batch_size):
+        stop = min(start + batch_size, current + 1)
+        slots = cache.get_many(
+            [_dirty_key(seq) for seq in range(start, stop)]
+        )
+
+        # Slots are read in order, so a missing one ends the flush
+        # until its writer registers the object.
+        complete = True
+        for seq in range(start, stop):
+            if _dirty_key(seq) not in slots and not _is_lost_slot(seq):
+                stop = seq
+                complete = False
+                break
+        dirty_keys = [_dirty_key(seq) for seq in range(start, stop)]
+        dirty = {slots[key] for key in dirty_keys if key in slots}
+
+        deltas = {}
+        for key, delta in cache.get_many(
+            [_delta_key(label, pk) for label, pk in dirty]
+        ).items():
+            if delta:
+                deltas[key] = delta
+
+        by_model = {}
+        for key, delta in deltas.items():
+            _, label, pk = key.rsplit(':', 2)
+            by_model.setdefault(label, {})[int(pk)] = delta
+
+        with transaction.atomic():
+            for label, model_deltas in by_model.items():
+                model = apps.get_model(label)
+                updated += model.objects.filter(
+                    pk__in=model_deltas
+                ).update(
+                    likes_quantity=F('likes_quantity') + Case(
+                        *[
+                            When(pk=pk, then=Value(delta))
+                            for pk, delta in model_deltas.items()
+                        ],
+                        default=Value(0)
+                    ),
+                    modified=timezone.now()
+                )
+
+        # Only subtract what was written, so increments
+        # made meanwhile are kept for the next flush.
+        for key, delta in deltas.items():
+            if cache.decr(key, delta) == 0:
+                cache.touch(key, DELTA_TIMEOUT)
+
+        cache.set(FLUSHED_SEQUENCE_KEY, stop - 1, timeout=None)
+        cache.delete_many(
+            dirty_keys + [_missing_key(seq) for seq in range(start, stop)]
+        )
+        if not complete:
+            break
+
+    return updated
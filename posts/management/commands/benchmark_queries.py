@@ -0,0 +1,134 @@
+"""Benchmark queries command."""
+
+# Django
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+# Models
+from posts.models import Comment, Post
+from users.models import User, UserSearchToken
+
+# Utils
+from users.search import rebuild_index, search_users
+import time
+
+
+class Command(BaseCommand):
+    """Shows the EXPLAIN plan and the timing of the hot queries
+    without and with the composite indexes of the models.
+
+    The indexes are dropped and created again while it runs, so it
+    must only be used on a scratch database, e.g. seeded with
+    `--seed`.
+    """
+
+    help = (
+        'Shows the plans and timings of the hot queries without and with '
+        'the model indexes. Use it only on a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Quantity of posts to create before benchmarking.'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Times each query is run, the best time is shown.'
+        )
+
+    def get_queries(self):
+        """Returns the hot queries keyed by name."""
+        user = Post.objects.values_list('user', flat=True).first()
+        post = Post.objects.filter(is_active=True).values_list(
+            'pk', flat=True
+        ).first()
+        return {
+            'active posts': Post.objects.filter(is_active=True)
+            .order_by('-created', '-pk')[:20],
+            'user posts': Post.objects.filter(user=user, is_active=True)
+            .order_by('-created', '-pk')[:20],
+            'post comments': Comment.objects.filter(post=post)[:20],
+            'verified clients': User.objects.filter(
+                is_client=True, is_verified=True
+            )[:20],
+            'user search': search_users(
+                User.objects.filter(is_client=True, is_verified=True),
+                'bench'
+            )[:20],
+        }
+
+    def seed(self, quantity):
+        """Creates users with posts and comments."""
+        User.objects.bulk_create([
+            User(
+                username=f'benchmark_{i}',
+                email=f'benchmark_{i}@example.com',
+                is_verified=i % 2 == 0
+            )
+            for i in range(max(quantity // 100, 1))
+        ])
+        users = User.objects.filter(username__startswith='benchmark_')
+        rebuild_index(users)
+        users = list(users)
+        Post.objects.bulk_create(
+            [
+                Post(
+                    user=users[i % len(users)],
+                    caption=f'Benchmark {i}',
+                    image='posts/pictures/benchmark.jpeg',
+                    is_active=i % 10 != 0
+                )
+                for i in range(quantity)
+            ],
+            batch_size=1000
+        )
+        posts = Post.objects.order_by('-pk').values_list('pk', flat=True)
+        Comment.objects.bulk_create(
+            [
+                Comment(
+                    user=users[i % len(users)],
+                    post_id=pk,
+                    content=f'Benchmark {i}'
+                )
+                for i, pk in enumerate(posts[:quantity])
+            ],
+            batch_size=1000
+        )
+
+    def run(self, label, queries, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        for name, queryset in queries.items():
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(f'{name}: {best * 1000:.2f} ms')
+            self.stdout.write(queryset.explain())
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+
+        queries = self.get_queries()
+        indexed = [
+            (model, index)
+            for model in (Post, Comment, User, UserSearchToken)
+            for index in model._meta.indexes
+        ]
+        with connection.schema_editor() as schema_editor:
+            for model, index in indexed:
+                schema_editor.remove_index(model, index)
+        try:
+            self.run('Without indexes', queries, options['repeat'])
+        finally:
+            with connection.schema_editor() as schema_editor:
+                for model, index in indexed:
+                    schema_editor.add_index(model, index)
+        self.run('With indexes', queries, options['repeat'])
@@ -0,0 +1,41 @@
+"""Flush likes command."""
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Utils
+from posts.buffers import flush_likes
+import time
+
+
+class Command(BaseCommand):
+    """Writes the buffered like counters to the database.
+
+    Runs once, or every `--interval` seconds when it is given,
+    so it can be used as a cron job or as a background worker.
+    Only one instance should run at a time.
+    """
+
+    help = 'Writes the buffered like counters to the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Keep running and flush every given seconds.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Quantity of buffered deltas read per batch.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            updated = flush_likes(batch_size=options['batch_size'])
+            self.stdout.write(f'Flushed likes of {updated} objects.')
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
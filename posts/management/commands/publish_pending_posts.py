@@ -0,0 +1,44 @@
+"""Publish pending posts command."""
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Utils
+from posts.publication import publish_pending_posts
+import time
+
+
+class Command(BaseCommand):
+    """Classifies again the pending posts which are due.
+
+    Runs once, or every `--interval` seconds when it is given, so
+    it can be used as a cron job or as a background worker.
+    """
+
+    help = 'Classifies again the pending posts which are due.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Keep running and retry the due posts every given seconds.'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Quantity of posts tried at a time.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            tried = publish_pending_posts(options['limit'])
+            if tried:
+                self.stdout.write(f'Tried {tried} pending posts.')
+            # A full batch is followed by the next one right away.
+            if tried == options['limit']:
+                continue
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,68 @@
+"""Reconcile counters command."""
+
+# Django
+from django.core.management.base import BaseCommand, CommandError
+
+# Utils
+from posts import buffers
+from utils.counters import get_counters, reconcile_counter
+
+
+class Command(BaseCommand):
+    """Recomputes the denormalized counters of posts,
+    comments and profiles and fixes the ones which drifted.
+
+    The buffered likes are flushed first, and the ones made
+    meanwhile are left to the next flush instead of being
+    counted twice. It's meant to be run nightly.
+    """
+
+    help = 'Recomputes the denormalized counters and fixes the drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'counters',
+            nargs='*',
+            help='Names of the counters to reconcile, all by default.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantity of rows checked per chunk.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the drift.'
+        )
+
+    def handle(self, *args, **options):
+        counters = get_counters()
+        names = options['counters'] or list(counters)
+        unknown = set(names) - set(counters)
+        if unknown:
+            raise CommandError('Unknown counters: {}. Choices: {}.'.format(
+                ', '.join(sorted(unknown)), ', '.join(counters)
+            ))
+
+        if buffers.is_enabled() and not options['dry_run']:
+            buffers.flush_likes()
+
+        for name in names:
+            def report(pk, stored, quantity, name=name):
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f'{name} pk={pk}: {stored} -> {quantity}'
+                    )
+
+            drift = reconcile_counter(
+                counters[name],
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+                report=report
+            )
+            self.stdout.write(
+                f'{name}: checked {drift.checked}, drifted {drift.drifted}, '
+                f'total drift {drift.total}.'
+            )
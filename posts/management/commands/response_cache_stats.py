@@ -0,0 +1,22 @@
+"""Response cache stats command."""
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Utils
+from utils.caching import get_metrics
+
+
+class Command(BaseCommand):
+    """Shows the hits and misses of the response cache."""
+
+    help = 'Shows the hits and misses of the response cache.'
+
+    def handle(self, *args, **options):
+        metrics = get_metrics()
+        total = metrics['hits'] + metrics['misses']
+        ratio = metrics['hits'] / total if total else 0
+        self.stdout.write(
+            f"hits: {metrics['hits']}, misses: {metrics['misses']}, "
+            f'hit ratio: {ratio:.2%}'
+        )
@@ -0,0 +1,109 @@
+"""Post Managers."""
+
+# Django
+from django.db import transaction
+from django.db.models import (
+    BooleanField, Exists, F, OuterRef, QuerySet, Value
+)
+from django.utils import timezone
+
+# Utils
+from posts import buffers
+from utils import caching
+
+
+class LikeableQuerySet(QuerySet):
+    """Likeable QuerySet.
+
+    LikeableQuerySet adds methods to annotate whether
+    the given user liked each object of a model with
+    a 'likes' many to many field, and to like or unlike
+    many objects at once.
+    """
+
+    def annotate_liked_by(self, user):
+        """Annotates 'liked_by_me' with an EXISTS subquery,
+        so a whole page is resolved in the same query.
+        """
+        if not user or not user.is_authenticated:
+            return self.annotate(
+                liked_by_me=Value(False, output_field=BooleanField())
+            )
+        through = self.model.likes.through
+        return self.annotate(liked_by_me=Exists(
+            through.objects.filter(
+                **{
+                    self.model._meta.model_name: OuterRef('pk'),
+                    'user': user.pk,
+                }
+            )
+        ))
+
+    def set_likes(self, user, likes):
+        """Likes or unlikes many objects of this queryset at once.
+
+        `likes` maps each pk to whether the user likes it. The
+        missing relationships are inserted with one statement, the
+        removed ones deleted with another, and 'likes_quantity'
+        is updated with one statement per direction.
+
+        The objects and the user's likes of them are locked first,
+        so concurrent or replayed batches, and the single likes,
+        wait for each other instead of counting the same change.
+
+        Returns the lists of liked and unliked pks which changed.
+        """
+        through = self.model.likes.through
+        field = self.model._meta.model_name
+        with transaction.atomic():
+            # Inserting a like checks its foreign key, which waits
+            # for these locks, and so do the other batches.
+            list(
+                self.model.objects.select_for_update().filter(
+                    pk__in=list(likes)
+                ).order_by('pk').values_list('pk', flat=True)
+            )
+            current = set(
+                through.objects.select_for_update().filter(
+                    user=user.pk, **{f'{field}__in': list(likes)}
+                ).values_list(f'{field}_id', flat=True)
+            )
+            liked = [
+                pk for pk, like in likes.items() if like and pk not in current
+            ]
+            unliked = [
+                pk for pk, like in likes.items() if not like and pk in current
+            ]
+            through.objects.bulk_create(
+                [
+                    through(user_id=user.pk, **{f'{field}_id': pk})
+                    for pk in liked
+                ],
+                ignore_conflicts=True
+            )
+            through.objects.filter(
+                user=user.pk, **{f'{field}__in': unliked}
+            ).delete()
+            for pks, delta in ((liked, 1), (unliked, -1)):
+                if not pks:
+                    continue
+                if buffers.is_enabled():
+                    for pk in pks:
+                        buffers.add_likes_delta(self.model(pk=pk), delta)
+                else:
+                    self.model.objects.filter(pk__in=pks).update(
+                        likes_quantity=F('likes_quantity') + delta,
+                        modified=timezone.now()
+                    )
+        changed = liked + unliked
+        if (
+            changed
+            and caching.is_enabled()
+            and hasattr(self.model, 'get_cache_scopes')
+        ):
+            changed_objects = self.model.objects.filter(
+                pk__in=changed
+            ).order_by().only('pk', 'user')
+            for obj in changed_objects:
+                caching.invalidate_instance(obj)
+        return liked, unliked
@@ -1,2 +1,3 @@
 from .post import Post
-from .comment import Comment
\ No newline at end of file
+from .comment import Comment
+from .image_blobs import ImageBlob
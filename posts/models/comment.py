@@ -1,13 +1,17 @@
 """Post comment model."""
 
 # Django
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
 
 # Models
 from posts.models import Post
 from users.models import User
 
 # Utils
+from posts import buffers
+from posts.managers import LikeableQuerySet
 from utils.models import AskalleryModel
 
 
@@ -40,23 +44,60 @@ class Comment(AskalleryModel, models.Model):
         )
     )
 
+    objects = LikeableQuerySet.as_manager()
+
+    class Meta(AskalleryModel.Meta):
+        """Meta options."""
+
+        indexes = [
+            # Keyset pagination of the comments of a post.
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
     def add_like(self, user):
         """Establishes a 'like' relationship between this comment and
         passed user, also updates this comment's 'likes_quantity' attribute.
+
+        Returns whether the like was added.
         """
-        if not self.likes.filter(pk=user.pk).exists():
-            self.likes.add(user)
-            self.likes_quantity += 1
-            self.save()
+        try:
+            with transaction.atomic():
+                Comment.likes.through.objects.create(comment=self, user=user)
+        except IntegrityError:
+            return False
+        if buffers.is_enabled():
+            buffers.add_likes_delta(self, 1)
+        else:
+            Comment.objects.filter(pk=self.pk).update(
+                likes_quantity=F('likes_quantity') + 1,
+                modified=timezone.now()
+            )
+        self.likes_quantity += 1
+        return True
 
     def remove_like(self, user):
         """Removes the 'like' relationship between this comment and
         passed user, also updates this comment's 'likes_quantity' attribute.
+
+        Returns whether the like was removed.
         """
-        if self.likes.filter(pk=user.pk).exists():
-            self.likes.remove(user)
-            self.likes_quantity -= 1
-            self.save()
+        deleted, _ = Comment.likes.through.objects.filter(
+            comment=self, user=user
+        ).delete()
+        if not deleted:
+            return False
+        if buffers.is_enabled():
+            buffers.add_likes_delta(self, -1)
+        else:
+            Comment.objects.filter(pk=self.pk).update(
+                likes_quantity=F('likes_quantity') - 1,
+                modified=timezone.now()
+            )
+        self.likes_quantity -= 1
+        return True
 
     def __str__(self):
         """Returns the user username 
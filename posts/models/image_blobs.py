@@ -0,0 +1,40 @@
+"""Image blob model."""
+
+# Django
+from django.db import models
+
+# Utils
+from utils.models import AskalleryModel
+
+
+class ImageBlob(AskalleryModel, models.Model):
+    """Image blob model.
+
+    Rendered images are stored once under the SHA-256 of their
+    content, an ImageBlob counts how many image renditions of
+    posts and profiles use the stored file.
+    """
+
+    name = models.CharField(
+        'name',
+        max_length=255,
+        unique=True,
+        help_text='File name made from the content hash.'
+    )
+
+    stored_name = models.CharField(
+        'stored name',
+        max_length=255,
+        db_index=True,
+        help_text='Name the storage saved the file under.'
+    )
+
+    references = models.PositiveIntegerField(
+        'references',
+        default=1,
+        help_text='The file is deleted when nothing references it.'
+    )
+
+    def __str__(self):
+        """Returns the file name."""
+        return self.name
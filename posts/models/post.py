@@ -1,13 +1,18 @@
 """Post model."""
 
 # Django
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
 
 # Models
 from users.models import User
 
 # Utils
-from utils.models import AskalleryModel
+from posts import buffers
+from posts.managers import LikeableQuerySet
+from utils import caching
+from utils.models import AskalleryModel, ClassificationStatus, ImageStatus
 
 
 class Post(AskalleryModel, models.Model):
@@ -31,6 +36,21 @@ class Post(AskalleryModel, models.Model):
         help_text='Its the main content of the post.',
     )
 
+    image_status = models.CharField(
+        'image status',
+        max_length=10,
+        choices=ImageStatus.choices,
+        default=ImageStatus.READY,
+        help_text='It will be ready when the image has been compressed.'
+    )
+
+    image_renditions = models.JSONField(
+        'image renditions',
+        default=dict,
+        blank=True,
+        help_text='Stored file name of each size of the image.'
+    )
+
     likes = models.ManyToManyField('users.User', related_name='post_likes')
 
     likes_quantity = models.IntegerField(
@@ -53,29 +73,112 @@ class Post(AskalleryModel, models.Model):
         )
     )
 
+    classification_status = models.CharField(
+        'classification status',
+        max_length=10,
+        choices=ClassificationStatus.choices,
+        default=ClassificationStatus.APPROVED,
+        help_text='The post is published when its image is approved.'
+    )
+
+    classification_attempts = models.PositiveSmallIntegerField(
+        'classification attempts',
+        default=0,
+        help_text='Quantity of times the image could not be classified.'
+    )
+
+    next_classification = models.DateTimeField(
+        'next classification',
+        null=True,
+        blank=True,
+        help_text=(
+            'When the pending image will be classified again, '
+            'empty when it is not retried anymore.'
+        )
+    )
+
     is_active = models.BooleanField(
         'active',
         default=True,
-        help_text='It will be False when the post is removed.'
+        help_text=(
+            'It will be False while the image is being classified '
+            'and when the post is removed.'
+        )
     )
 
+    objects = LikeableQuerySet.as_manager()
+
+    class Meta(AskalleryModel.Meta):
+        """Meta options."""
+
+        indexes = [
+            # Listing and keyset pagination of the active posts.
+            models.Index(
+                fields=['is_active', '-created', '-id'],
+                name='post_active_created_idx'
+            ),
+            # Posts of a user.
+            models.Index(
+                fields=['user', 'is_active', '-created', '-id'],
+                name='post_user_active_created_idx'
+            ),
+            # Pending posts whose classification is retried.
+            models.Index(
+                fields=['classification_status', 'next_classification'],
+                name='post_classification_retry_idx'
+            ),
+        ]
+
+    def get_cache_scopes(self):
+        """Returns the response cache scopes of this post."""
+        return [
+            caching.post_scope(self.pk),
+            caching.user_posts_scope(self.user_id)
+        ]
+
     def add_like(self, user):
         """Establishes a 'like' relationship between this post and
         passed user, also updates this post's 'likes_quantity' attribute.
+
+        Returns whether the like was added.
         """
-        if not self.likes.filter(pk=user.pk).exists():
-            self.likes.add(user)
-            self.likes_quantity += 1
-            self.save()
+        try:
+            with transaction.atomic():
+                Post.likes.through.objects.create(post=self, user=user)
+        except IntegrityError:
+            return False
+        if buffers.is_enabled():
+            buffers.add_likes_delta(self, 1)
+        else:
+            Post.objects.filter(pk=self.pk).update(
+                likes_quantity=F('likes_quantity') + 1,
+                modified=timezone.now()
+            )
+        self.likes_quantity += 1
+        caching.invalidate_instance(self)
+        return True
 
     def remove_like(self, user):
         """Removes the 'like' relationship between this post and
         passed user, also updates this post's 'likes_quantity' attribute.
+
+        Returns whether the like was removed.
         """
-        if self.likes.filter(pk=user.pk).exists():
-            self.likes.remove(user)
-            self.likes_quantity -= 1
-            self.save()
+        deleted, _ = Post.likes.through.objects.filter(
+            post=self, user=user
+        ).delete()
+        if not deleted:
+            return False
+        if buffers.is_enabled():
+            buffers.add_likes_delta(self, -1)
+        else:
+            Post.objects.filter(pk=self.pk).update(
+                likes_quantity=F('likes_quantity') - 1,
+                modified=timezone.now()
+            )
+        self.likes_quantity -= 1
+        caching.invalidate_instance(self)
+        return True
 
     def add_comment(self, user, content):
         """Creates a 'Comment' instance with passed user and content,
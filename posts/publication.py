@@ -0,0 +1,160 @@
+"""Post publication.
+
+New posts are stored inactive and published in the background
+once their image is classified as an Asuka picture, so the upload
+request doesn't wait for the classifier.
+
+When the classifier can't give a verdict the post stays pending and
+`publish_pending_posts` retries it with an exponential backoff, up
+to `ASUKA_CLASSIFICATION_MAX_ATTEMPTS` times.
+
+New posts are stored with their first classification leased to the
+background worker, so `publish_pending_posts` picks them up when the
+process dies before publishing them.
+"""
+
+# Django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+# Models
+from posts.models import Post
+
+# Utils
+from posts import timelines
+from utils import caching
+from utils.classification import ClassificationError, classify_picture
+from utils.images import (
+    POST_IMAGE_RENDITIONS,
+    reduce_image,
+    render_stored_image,
+    run_in_background,
+)
+from utils.models import ClassificationStatus
+from datetime import timedelta
+from io import BytesIO
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def publish_post(post):
+    """Schedules the classification, the rendering of the
+    image and the publication of the given post.
+    """
+    run_in_background(_publish_post, post.pk)
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        post.refresh_from_db()
+
+
+def get_classification_lease():
+    """Returns when a claimed classification is considered lost
+    and the post may be claimed again.
+    """
+    return timezone.now() + timedelta(
+        seconds=settings.ASUKA_CLASSIFIER_TIMEOUT * 2
+    )
+
+
+def get_retry_delay(attempts):
+    """Returns the seconds to wait before classifying a post
+    again after the given quantity of attempts.
+    """
+    return settings.ASUKA_CLASSIFICATION_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def _classify_post_image(post):
+    """Returns whether the post image is an Asuka picture.
+
+    Raises `ClassificationError` when the classifier can't
+    give a verdict in time.
+    """
+    with post.image.open('rb') as original:
+        img = reduce_image(original)
+    img_io = BytesIO()
+    img.save(img_io, 'JPEG', quality=100)
+    image = ContentFile(img_io.getvalue(), name=f'classify_{post.pk}.jpeg')
+    return classify_picture(image)
+
+
+def _record_failure(post):
+    """Schedules the next classification of the post, or stops
+    retrying it after the maximum attempts.
+    """
+    attempts = post.classification_attempts + 1
+    next_classification = None
+    if attempts < settings.ASUKA_CLASSIFICATION_MAX_ATTEMPTS:
+        next_classification = timezone.now() + timedelta(
+            seconds=get_retry_delay(attempts)
+        )
+    Post.objects.filter(pk=post.pk).update(
+        classification_attempts=attempts,
+        next_classification=next_classification,
+        modified=timezone.now()
+    )
+
+
+def _publish_post(pk):
+    """Classifies the post image, renders it and publishes the post."""
+    post = Post.objects.select_related('user__profile').filter(pk=pk).first()
+    if post is None:
+        return
+
+    if post.classification_status == ClassificationStatus.PENDING:
+        try:
+            is_asuka_picture = _classify_post_image(post)
+        except ClassificationError:
+            logger.warning('Post %s image could not be classified.', pk)
+            _record_failure(post)
+            return
+        if not is_asuka_picture:
+            Post.objects.filter(pk=pk).update(
+                classification_status=ClassificationStatus.REJECTED,
+                next_classification=None,
+                modified=timezone.now()
+            )
+            return
+
+    if not render_stored_image(Post, pk, 'image', POST_IMAGE_RENDITIONS):
+        # The image status tells it couldn't be processed.
+        Post.objects.filter(pk=pk).update(
+            classification_status=ClassificationStatus.APPROVED,
+            next_classification=None,
+            modified=timezone.now()
+        )
+        return
+    Post.objects.filter(pk=pk).update(
+        classification_status=ClassificationStatus.APPROVED,
+        next_classification=None,
+        is_active=True,
+        modified=timezone.now()
+    )
+    caching.invalidate_instance(post)
+    timelines.push_post(post)
+
+
+def publish_pending_posts(limit=None):
+    """Classifies again the pending posts which are due and
+    returns the quantity of posts which were tried.
+
+    Each post is claimed by moving its next classification
+    forward, so several workers can run at a time.
+    """
+    now = timezone.now()
+    due = Post.objects.filter(
+        classification_status=ClassificationStatus.PENDING,
+        next_classification__lte=now
+    ).order_by('next_classification').values_list(
+        'pk', 'next_classification'
+    )[:limit]
+    tried = 0
+    for pk, next_classification in due:
+        claimed = Post.objects.filter(
+            pk=pk, next_classification=next_classification
+        ).update(next_classification=get_classification_lease())
+        if claimed:
+            _publish_post(pk)
+            tried += 1
+    return tried
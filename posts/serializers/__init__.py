@@ -1,2 +1,3 @@
 from .posts import *
 from .comments import *
+from .likes import *
@@ -8,14 +8,22 @@ from rest_framework.generics import get_object_or_404
 from posts.models import Post, Comment
 
 # Serializers
+from posts.serializers.likes import PendingLikesListSerializer
 from users.serializers import MinimumUserFieldsModelSerializer
 
+# Utils
+from posts.buffers import get_pending_likes
+
 
 class CommentModelSerializer(serializers.ModelSerializer):
     """Comment Model Serializer."""
 
     user = MinimumUserFieldsModelSerializer(read_only=True)
 
+    likes_quantity = serializers.SerializerMethodField()
+
+    liked_by_me = serializers.SerializerMethodField()
+
     request_user = serializers.HiddenField(
         default=serializers.CurrentUserDefault(),
         write_only=True
@@ -24,11 +32,22 @@ class CommentModelSerializer(serializers.ModelSerializer):
     class Meta:
         """Meta options."""
         model = Comment
+        list_serializer_class = PendingLikesListSerializer
         fields = (
             'pk', 'user', 'content', 'request_user',
-            'post', 'likes_quantity'
+            'post', 'likes_quantity', 'liked_by_me'
         )
-        read_only_fields = ('pk', 'user', 'likes_quantity')
+        read_only_fields = ('pk', 'user', 'likes_quantity', 'liked_by_me')
+
+    def get_likes_quantity(self, instance):
+        """Returns the stored likes plus the buffered ones."""
+        return instance.likes_quantity + get_pending_likes(instance)
+
+    def get_liked_by_me(self, instance):
+        """Returns whether the request user liked it, annotated
+        by the view with `annotate_liked_by`.
+        """
+        return getattr(instance, 'liked_by_me', False)
 
     def to_internal_value(self, data):
         if 'post' in data:
@@ -68,7 +87,8 @@ class CommentLikeSerializer(serializers.Serializer):
         request_user = data['request_user']
         liked_comment = self.context['liked_comment']
         if self.context['request'].method == 'POST':
-            liked_comment.add_like(request_user)
+            changed = liked_comment.add_like(request_user)
         else:
-            liked_comment.remove_like(request_user)
+            changed = liked_comment.remove_like(request_user)
+        self.context['changed'] = changed
         return liked_comment
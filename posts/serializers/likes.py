@@ -0,0 +1,111 @@
+"""Like batch serializers."""
+
+# REST Framework
+from rest_framework import serializers
+
+# Django
+from django.db.models import Manager
+
+# Models
+from posts.models import Post, Comment
+
+# Utils
+from posts.buffers import prefetch_pending_likes
+
+
+class PendingLikesListSerializer(serializers.ListSerializer):
+    """List serializer which reads the buffered likes of
+    every object at once.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, Manager) else data)
+        prefetch_pending_likes(items)
+        return super().to_representation(items)
+
+
+class LikeOperationSerializer(serializers.Serializer):
+    """Like operation serializer."""
+
+    LIKE = 'like'
+    UNLIKE = 'unlike'
+
+    pk = serializers.IntegerField()
+
+    action = serializers.ChoiceField(choices=(LIKE, UNLIKE))
+
+
+class LikeBatchSerializer(serializers.Serializer):
+    """Like batch serializer.
+
+    Applies a list of like and unlike operations of the request
+    user. When a pk appears more than once, its last operation
+    wins, as clients replay their queued operations in order.
+    The objects which don't exist are reported in 'not_found'.
+
+    Subclasses set `queryset` to the objects which can be liked.
+    """
+
+    queryset = None
+
+    MAX_OPERATIONS = 100
+
+    operations = LikeOperationSerializer(
+        many=True, allow_empty=False, max_length=MAX_OPERATIONS
+    )
+
+    request_user = serializers.HiddenField(
+        default=serializers.CurrentUserDefault()
+    )
+
+    def get_queryset(self):
+        """Returns the queryset of the objects which can be liked."""
+        assert self.queryset is not None, (
+            f'{self.__class__.__name__} should set a `queryset` attribute.'
+        )
+        return self.queryset.all()
+
+    def validate(self, data):
+        """Verifies the objects exist with one query."""
+        like = LikeOperationSerializer.LIKE
+        likes = {
+            operation['pk']: operation['action'] == like
+            for operation in data['operations']
+        }
+        existing = set(
+            self.get_queryset().filter(pk__in=list(likes)).order_by()
+            .values_list('pk', flat=True)
+        )
+        data['likes'] = {
+            pk: like for pk, like in likes.items() if pk in existing
+        }
+        data['not_found'] = sorted(set(likes) - existing)
+        return data
+
+    def create(self, data):
+        """Applies the operations and returns the result."""
+        liked, unliked = self.get_queryset().set_likes(
+            data['request_user'], data['likes']
+        )
+        changed = set(liked) | set(unliked)
+        return {
+            'liked': sorted(liked),
+            'unliked': sorted(unliked),
+            'unchanged': sorted(set(data['likes']) - changed),
+            'not_found': data['not_found'],
+        }
+
+    def to_representation(self, instance):
+        return instance
+
+
+class PostLikeBatchSerializer(LikeBatchSerializer):
+    """Post like batch serializer."""
+
+    queryset = Post.objects.filter(is_active=True)
+
+
+class CommentLikeBatchSerializer(LikeBatchSerializer):
+    """Comment like batch serializer."""
+
+    queryset = Comment.objects.filter(post__is_active=True)
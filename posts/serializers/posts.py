@@ -11,10 +11,14 @@ from django.conf import settings
 from posts.models import Post
 
 # Serializers
+from posts.serializers.likes import PendingLikesListSerializer
 from users.serializers import MinimumUserFieldsModelSerializer
 
 # Utils
-from utils.serializers import is_asuka_picture, size_reduction
+from posts.buffers import get_pending_likes
+from posts.publication import get_classification_lease, publish_post
+from utils.models import ClassificationStatus, ImageStatus
+from utils.serializers import get_rendition_urls
 
 
 class PostModelSerializer(serializers.ModelSerializer):
@@ -22,18 +26,43 @@ class PostModelSerializer(serializers.ModelSerializer):
 
     user = MinimumUserFieldsModelSerializer(read_only=True)
 
+    likes_quantity = serializers.SerializerMethodField()
+
+    liked_by_me = serializers.SerializerMethodField()
+
+    images = serializers.SerializerMethodField()
+
     class Meta:
         """Meta options."""
         model = Post
+        list_serializer_class = PendingLikesListSerializer
         fields = (
-            'pk', 'user', 'caption', 'image', 'likes_quantity',
-            'comments_quantity', 'created'
+            'pk', 'user', 'caption', 'image', 'images', 'image_status',
+            'likes_quantity', 'liked_by_me', 'comments_quantity', 'created'
         )
         read_only_fields = (
-            'pk', 'user', 'image', 'likes_quantity',
-            'comments_quantity', 'created'
+            'pk', 'user', 'image', 'image_status', 'likes_quantity',
+            'liked_by_me', 'comments_quantity', 'created'
+        )
+
+    def get_images(self, instance):
+        """Returns the URL of each size of the image."""
+        return get_rendition_urls(
+            self.context.get('request'),
+            instance.image,
+            instance.image_renditions
         )
 
+    def get_likes_quantity(self, instance):
+        """Returns the stored likes plus the buffered ones."""
+        return instance.likes_quantity + get_pending_likes(instance)
+
+    def get_liked_by_me(self, instance):
+        """Returns whether the request user liked it, annotated
+        by the view with `annotate_liked_by`.
+        """
+        return getattr(instance, 'liked_by_me', False)
+
 
 class PostCreationModelSerializer(serializers.ModelSerializer):
     """Post creation model serializer."""
@@ -43,29 +72,39 @@ class PostCreationModelSerializer(serializers.ModelSerializer):
     class Meta:
         """Meta options."""
         model = Post
-        fields = ('user', 'caption', 'image')
+        fields = (
+            'pk', 'user', 'caption', 'image', 'image_status',
+            'classification_status'
+        )
+        read_only_fields = ('pk', 'image_status', 'classification_status')
 
     def validate_image(self, value):
-        """Verifies the image format and that is an asuka picture.."""
+        """Verifies the image format.
+
+        Whether it's an asuka picture is verified after the
+        post is stored, see `posts.publication`.
+        """
         VALID_IMAGE_EXTENSIONS = ('JPG', 'JPEG', 'PNG')
         if value.image.format not in VALID_IMAGE_EXTENSIONS:
             raise serializers.ValidationError(
                 {'image': 'Only jpg, jpeg and png formats are allowed.'}
             )
-        if settings.LOCAL_DEV:
-            return value
-        image_for_check = size_reduction(value, quality=100)
-        if is_asuka_picture(image=image_for_check):
-            return value
-        raise serializers.ValidationError(
-            {'image': 'The image must be about ´Asuka Langley´ ' +
-             'from ´Neon Genesis Evangelion´.'}
-        )
+        return value
 
     def create(self, data):
-        """Compress the image before stororing it."""
-        data['image'] = size_reduction(data['image'])
-        return super(PostCreationModelSerializer, self).create(data)
+        """Stores the post with the original image as pending,
+        it will be published once its image is classified
+        as an asuka picture and compressed. Its classification is
+        leased, so the post is retried if it's never published.
+        """
+        data['image_status'] = ImageStatus.PROCESSING
+        if not settings.LOCAL_DEV:
+            data['classification_status'] = ClassificationStatus.PENDING
+            data['next_classification'] = get_classification_lease()
+            data['is_active'] = False
+        post = super(PostCreationModelSerializer, self).create(data)
+        publish_post(post)
+        return post
 
 
 class PostLikeSerializer(serializers.Serializer):
@@ -90,7 +129,8 @@ class PostLikeSerializer(serializers.Serializer):
         request_user = data['request_user']
         liked_post = self.context['liked_post']
         if self.context['request'].method == 'POST':
-            liked_post.add_like(request_user)
+            changed = liked_post.add_like(request_user)
         else:
-            liked_post.remove_like(request_user)
+            changed = liked_post.remove_like(request_user)
+        self.context['changed'] = changed
         return liked_post
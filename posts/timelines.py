@@ -0,0 +1,176 @@
+"""Home feed timelines.
+
+Every user has a precomputed timeline: a list of post pks, newest
+first, stored in the default cache and bounded by `TIMELINE_LENGTH`.
+New posts are pushed into the timelines of their author's followers
+(fan-out-on-write), except for authors with more than
+`TIMELINE_FANOUT_LIMIT` followers, whose posts are merged into the
+feed when it is read (fan-out-on-read).
+
+A missing timeline is rebuilt from the database when it is read,
+so timelines can be dropped at any time, e.g. after a follow, and
+they expire after `TIMELINE_TIMEOUT` seconds.
+
+A timeline is only written while holding its lock. A writer which
+finds it locked drops the timeline and flags it, so the lock holder
+drops it too instead of storing an update which missed the other.
+A rebuild marks the timeline as building before it reads the
+database, and writers flag and drop a missing timeline which is
+being built, as the rebuild may have read the posts before theirs.
+
+Timelines are only kept when the default cache is shared by the
+processes, otherwise the feed is read from the database.
+"""
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+# Models
+from posts.models import Post
+from users.models import Follow
+
+# Utils
+from utils.caching import is_shared_cache
+
+
+LOCK_TIMEOUT = 10
+
+
+def is_enabled():
+    """Returns whether the timelines are kept in the cache."""
+    return is_shared_cache()
+
+
+def _timeline_key(user_pk):
+    return 'timeline:{}'.format(user_pk)
+
+
+def _lock_key(key):
+    return '{}:lock'.format(key)
+
+
+def _dirty_key(key):
+    return '{}:dirty'.format(key)
+
+
+def _building_key(key):
+    return '{}:building'.format(key)
+
+
+def _drop_timeline(key):
+    """Drops the timeline and flags it, so a concurrent
+    writer doesn't store it afterwards.
+    """
+    cache.set(_dirty_key(key), True, timeout=LOCK_TIMEOUT)
+    cache.delete(key)
+
+
+def _write_timeline(key, update):
+    """Stores the timeline `update` returns for the cached one,
+    holding the lock of the key. `update` returns None to leave
+    the key alone.
+    """
+    lock_key = _lock_key(key)
+    if not cache.add(lock_key, True, timeout=LOCK_TIMEOUT):
+        _drop_timeline(key)
+        return
+    try:
+        timeline = update(cache.get(key))
+        if timeline is not None:
+            cache.set(key, timeline, timeout=settings.TIMELINE_TIMEOUT)
+            if cache.get(_dirty_key(key)):
+                cache.delete_many([key, _dirty_key(key)])
+    finally:
+        cache.delete(lock_key)
+
+
+def _update_follower_timelines(post, update):
+    """Applies `update` to the cached timelines of the post
+    author's followers. Missing timelines are left alone, unless
+    they are being built.
+    """
+    if post.user is None or not is_enabled():
+        return
+    profile = post.user.profile
+    if profile.followers_quantity > settings.TIMELINE_FANOUT_LIMIT:
+        return
+    follower_pks = Follow.objects.filter(
+        followed=post.user_id
+    ).values_list('follower_id', flat=True)
+    keys = [_timeline_key(pk) for pk in follower_pks]
+    cached = cache.get_many(keys + [_building_key(key) for key in keys])
+    for key in keys:
+        if key in cached:
+            _write_timeline(
+                key,
+                lambda timeline: (
+                    None if timeline is None else update(timeline)
+                )
+            )
+        elif _building_key(key) in cached:
+            _drop_timeline(key)
+
+
+def push_post(post):
+    """Pushes the given post into its author's followers' timelines."""
+    _update_follower_timelines(
+        post,
+        lambda timeline: ([post.pk] + timeline)[:settings.TIMELINE_LENGTH]
+    )
+
+
+def remove_post(post):
+    """Removes the given post from its author's followers' timelines."""
+    _update_follower_timelines(
+        post,
+        lambda timeline: [pk for pk in timeline if pk != post.pk]
+    )
+
+
+def invalidate_timeline(user):
+    """Drops the user's timeline so it's rebuilt on the next read."""
+    cache.delete(_timeline_key(user.pk))
+
+
+def get_timeline(user):
+    """Returns the post pks of the user's timeline,
+    building it from the database if it's missing.
+    """
+    if not is_enabled():
+        return _build_timeline(user)
+    key = _timeline_key(user.pk)
+    timeline = cache.get(key)
+    if timeline is None:
+        cache.set(_building_key(key), True, timeout=LOCK_TIMEOUT)
+        timeline = _build_timeline(user)
+        _write_timeline(key, lambda cached: cached or timeline)
+    return timeline
+
+
+def _build_timeline(user):
+    return list(
+        _get_followed_posts(user).order_by('-created').values_list(
+            'pk', flat=True
+        )[:settings.TIMELINE_LENGTH]
+    )
+
+
+def _get_followed_posts(user):
+    return Post.objects.filter(
+        user__follower_edges__follower=user, is_active=True
+    )
+
+
+def get_feed_queryset(user):
+    """Returns the posts of the users followed by the given user."""
+    if not is_enabled():
+        return _get_followed_posts(user)
+    popular_users = user.following.filter(
+        profile__followers_quantity__gt=settings.TIMELINE_FANOUT_LIMIT
+    )
+    return Post.objects.filter(
+        Q(pk__in=get_timeline(user)) | Q(user__in=popular_users),
+        is_active=True
+    )
@@ -15,7 +15,8 @@ from users.permissions import HasAccountVerified
 # Serializers
 from posts.serializers import (
     CommentModelSerializer,
-    CommentLikeSerializer
+    CommentLikeSerializer,
+    CommentLikeBatchSerializer
 )
 
 # Models
@@ -39,11 +40,15 @@ class CommentViewSet(mixins.CreateModelMixin,
         serializer_class = CommentModelSerializer
         if self.action == "like":
             serializer_class = CommentLikeSerializer
+        elif self.action == "like_batch":
+            serializer_class = CommentLikeBatchSerializer
         return serializer_class
 
     def get_queryset(self):
         """Assigns queryset based on action."""
-        queryset = Comment.objects.filter(post__is_active=True)
+        queryset = Comment.objects.filter(
+            post__is_active=True
+        ).select_related('user__profile', 'post')
         return queryset
 
     def perform_destroy(self, instance):
@@ -57,11 +62,29 @@ class CommentViewSet(mixins.CreateModelMixin,
     def like(self, request, *args, **kwargs):
         """Establishes or removes a relationship
         between the request user and the given comment.
+
+        Responds with 200 instead of 201/204 when the
+        relationship was already in the requested state.
         """
         serializer = self.get_serializer(data=kwargs)
         serializer.is_valid(raise_exception=True)
         liked_comment = serializer.save()
+        changed = serializer.context['changed']
+        data = {'liked_comment': liked_comment.pk, 'changed': changed}
         if request.method == "DELETE":
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        data = {'liked_comment': liked_comment.pk}
-        return Response(data, status.HTTP_201_CREATED)
+            if changed:
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            return Response(data, status.HTTP_200_OK)
+        if changed:
+            return Response(data, status.HTTP_201_CREATED)
+        return Response(data, status.HTTP_200_OK)
+
+    @action(detail=False, methods=['POST'], url_path='likes/batch')
+    def like_batch(self, request, *args, **kwargs):
+        """Applies a list of like and unlike operations
+        of the request user.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.save()
+        return Response(data, status.HTTP_200_OK)
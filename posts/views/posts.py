@@ -1,5 +1,8 @@
 """Post views."""
 
+# Django
+from django.conf import settings
+
 # REST Framework
 from rest_framework import viewsets, mixins, status
 from rest_framework.generics import get_object_or_404
@@ -7,9 +10,6 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.filters import OrderingFilter
 
-# Django
-from django.http import FileResponse, Http404
-
 # Permissions
 from rest_framework.permissions import (
     AllowAny,
@@ -20,7 +20,7 @@ from posts.permissions import IsPostOwner
 # Serializers
 from posts.serializers import (
     PostCreationModelSerializer, PostModelSerializer, PostLikeSerializer,
-    CommentModelSerializer
+    PostLikeBatchSerializer, CommentModelSerializer
 )
 from users.permissions import HasAccountVerified
 
@@ -28,8 +28,39 @@ from users.permissions import HasAccountVerified
 from posts.models import Post, Comment
 
 # Utils
-from os import remove as remove_file
-from os.path import exists as file_exists
+from posts import timelines
+from utils import caching
+from utils.caching import cache_anonymous_response
+from utils.conditional import conditional_on_modified
+from utils.media import serve_file
+from utils.pagination import CreatedCursorPagination
+
+
+TEMPORAL_IMAGES_ROOT = '/app/tmp_images/'
+
+# Posts and comments are serialized with their author and profile.
+CONDITIONAL_FIELDS = ('modified', 'user__modified', 'user__profile__modified')
+
+
+def get_post_scopes(view, request, pk):
+    """Returns the response cache scopes of a post detail, which
+    shows its author's profile too.
+
+    The author of a post doesn't change, so it's cached
+    to look the response up without querying the post.
+    """
+    scopes = [caching.post_scope(pk)]
+    if not str(pk).isdigit():
+        return scopes
+    cache = caching.get_cache()
+    key = '{}:post_author:{}'.format(caching.KEY_PREFIX, pk)
+    user_pk = cache.get(key)
+    if user_pk is None:
+        user_pk = Post.objects.filter(pk=pk).values_list(
+            'user_id', flat=True
+        ).first()
+        cache.set(key, user_pk, settings.RESPONSE_CACHE_TIMEOUT)
+    return scopes + [caching.user_scope(user_pk)]
 
 
 class PostViewSet(
@@ -45,6 +76,7 @@ class PostViewSet(
     filter_backends = [OrderingFilter]
     ordering_fields = ['created', 'modified']
     ordering = ['-created']
+    pagination_class = CreatedCursorPagination
 
     def get_permissions(self):
         """Assign permissions based on action."""
@@ -62,23 +94,29 @@ class PostViewSet(
             queryset = Post.objects.filter(
                 likes=self.request.user, is_active=True
             )
+        elif self.action == 'feed':
+            queryset = timelines.get_feed_queryset(self.request.user)
         elif self.action == 'comments':
             post = get_object_or_404(
                 Post, pk=self.kwargs.get('pk'), is_active=True
             )
             queryset = Comment.objects.filter(post=post)
-        return queryset
+        return queryset.select_related('user__profile').annotate_liked_by(
+            self.request.user
+        )
 
     def get_serializer_class(self):
         """Assigns serializer based on action."""
         if self.action in (
-            'liked', 'list', 'retrieve', 'partial_update', 'update'
+            'liked', 'feed', 'list', 'retrieve', 'partial_update', 'update'
         ):
             return PostModelSerializer
         elif self.action == 'create':
             return PostCreationModelSerializer
         elif self.action == 'like':
             return PostLikeSerializer
+        elif self.action == 'like_batch':
+            return PostLikeBatchSerializer
         elif self.action == 'comments':
             return CommentModelSerializer
 
@@ -88,47 +126,68 @@ class PostViewSet(
         """
         instance.is_active = False
         instance.save()
+        timelines.remove_post(instance)
+
+    @conditional_on_modified(*CONDITIONAL_FIELDS)
+    def list(self, request, *args, **kwargs):
+        """Lists the active posts, or the posts and comments of
+        the actions which call it.
+        """
+        return super(PostViewSet, self).list(request, *args, **kwargs)
+
+    @cache_anonymous_response(get_post_scopes)
+    @conditional_on_modified(*CONDITIONAL_FIELDS, detail=True)
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieves an active post."""
+        return super(PostViewSet, self).retrieve(request, *args, **kwargs)
 
     @action(detail=True, methods=['POST', 'DELETE'])
     def like(self, request, *args, **kwargs):
         """Establishes or removes a relationship
         between the request user and the given post.
+
+        Responds with 200 instead of 201/204 when the
+        relationship was already in the requested state.
         """
         serializer = self.get_serializer(data=kwargs)
         serializer.is_valid(raise_exception=True)
         liked_post = serializer.save()
+        changed = serializer.context['changed']
+        data = {'liked_post': liked_post.pk, 'changed': changed}
         if request.method == "DELETE":
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        data = {'liked_post': liked_post.pk}
-        return Response(data, status.HTTP_201_CREATED)
+            if changed:
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            return Response(data, status.HTTP_200_OK)
+        if changed:
+            return Response(data, status.HTTP_201_CREATED)
+        return Response(data, status.HTTP_200_OK)
+
+    @action(detail=False, methods=['POST'], url_path='likes/batch')
+    def like_batch(self, request, *args, **kwargs):
+        """Applies a list of like and unlike operations
+        of the request user.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.save()
+        return Response(data, status.HTTP_200_OK)
 
     @action(detail=False, methods=['GET'])
     def liked(self, request, *args, **kwargs):
         """List all liked posts by the request user."""
         return self.list(request, *args, **kwargs)
 
+    @action(detail=False, methods=['GET'])
+    def feed(self, request, *args, **kwargs):
+        """List the posts of the users followed by the request user."""
+        return self.list(request, *args, **kwargs)
+
     @action(detail=True, methods=['GET'])
     def comments(self, request, *args, **kwargs):
         """List all comments of the given post."""
         return self.list(request, *args, **kwargs)
 
 
-def serve_temporal_image(response, *args, **kwargs):
+def serve_temporal_image(request, image):
     """Serves a temporal image if this is in /app/tmp_images/"""
-    image_path = '/app/tmp_images/{}'.format(kwargs.get('image'))
-    print('/'*100)
-    print(image_path)
-    print('kwargs:', kwargs)
-    print('file_exists:', file_exists(image_path))
-    import os
-    print('where:', os.system('pwd'))
-    print('/'*100)
-    if file_exists(image_path):
-        with open(image_path, 'rb') as img:
-            response = FileResponse(img)
-        #  remove_file(image_path)
-            print('god')
-            return response
-    else:
-        print('kuak')
-        raise Http404('Image not found')
+    return serve_file(request, image, TEMPORAL_IMAGES_ROOT)
@@ -0,0 +1,118 @@
+"""Picture classification tests."""
+
+# Django
+from django.test import SimpleTestCase, override_settings
+
+# Utils
+from utils.classification import (
+    BaseClassifier,
+    ClassificationError,
+    ColorHeuristicClassifier,
+    VerdictCache,
+    classify_picture,
+    perceptual_hash,
+    verdict_cache,
+)
+from io import BytesIO
+from PIL import Image, ImageDraw
+
+
+classified_images = []
+
+
+class CountingClassifier(BaseClassifier):
+    """Classifier which records the classified images."""
+
+    def classify(self, image):
+        classified_images.append(image)
+        return True
+
+
+class SlowClassifier(BaseClassifier):
+    """Classifier which never gives a verdict in time."""
+
+    def classify(self, image):
+        raise ClassificationError()
+
+
+def create_image_file(color='white', square=(0, 0, 0, 0)):
+    """Returns an in-memory PNG with a black square drawn on it."""
+    image = Image.new('RGB', (200, 200), color)
+    ImageDraw.Draw(image).rectangle(square, fill='black')
+    image_file = BytesIO()
+    image.save(image_file, 'PNG')
+    image_file.seek(0)
+    return image_file
+
+
+@override_settings(
+    ASUKA_CLASSIFIER='tests.posts.test_classification.CountingClassifier'
+)
+class ClassificationTestCase(SimpleTestCase):
+    """Picture classification test case."""
+
+    def setUp(self):
+        verdict_cache.clear()
+        classified_images.clear()
+
+    def test_verdicts_are_cached(self):
+        """Verifies that re-uploads and near-duplicates
+        don't call the classifier again.
+        """
+        image = create_image_file(square=(20, 20, 100, 100))
+        near_duplicate = create_image_file(square=(20, 20, 101, 101))
+        different = create_image_file(square=(100, 0, 200, 200))
+
+        self.assertTrue(classify_picture(image))
+        self.assertTrue(classify_picture(image))
+        self.assertTrue(classify_picture(near_duplicate))
+        self.assertEqual(len(classified_images), 1)
+
+        self.assertTrue(classify_picture(different))
+        self.assertEqual(len(classified_images), 2)
+
+    def test_errors_are_not_cached(self):
+        """Verifies that a classification error is raised
+        and that it isn't cached as a verdict.
+        """
+        image = create_image_file()
+        with override_settings(
+            ASUKA_CLASSIFIER='tests.posts.test_classification.SlowClassifier'
+        ):
+            with self.assertRaises(ClassificationError):
+                classify_picture(image)
+
+        self.assertTrue(classify_picture(image))
+        self.assertEqual(len(classified_images), 1)
+
+    def test_color_heuristic_classifier(self):
+        """Verifies that the heuristic classifier accepts
+        pictures with enough red pixels.
+        """
+        classifier = ColorHeuristicClassifier(timeout=1)
+
+        self.assertFalse(classifier.classify(create_image_file()))
+        self.assertTrue(classifier.classify(create_image_file(color='red')))
+
+    def test_verdict_cache_eviction(self):
+        """Verifies that the verdicts expire and that
+        the least recently used ones are evicted.
+        """
+        hashes = [
+            perceptual_hash(create_image_file(square=square))
+            for square in ((0, 0, 100, 200), (0, 0, 200, 100), (0, 0, 0, 0))
+        ]
+        cache = VerdictCache(max_size=2, ttl=60, max_distance=0)
+        cache.set(hashes[0], True)
+        cache.set(hashes[1], False)
+        cache.get(hashes[0])
+        cache.set(hashes[2], True)
+
+        self.assertTrue(cache.get(hashes[0]))
+        self.assertIsNone(cache.get(hashes[1]))
+        self.assertTrue(cache.get(hashes[2]))
+
+        cache = VerdictCache(max_size=2, ttl=0, max_distance=0)
+        cache.set(hashes[0], True)
+
+        self.assertIsNone(cache.get(hashes[0]))
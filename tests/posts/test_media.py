@@ -0,0 +1,111 @@
+"""Media serving tests."""
+
+# Django
+from django.conf import settings
+from django.test import AsyncClient, TestCase, override_settings
+
+# Utils
+import os
+
+
+class MediaServingTestCase(TestCase):
+    """Media serving test case."""
+
+    def setUp(self):
+        self.content = bytes(range(256)) * 4
+        self.path = os.path.join(settings.MEDIA_ROOT, 'media_test.jpeg')
+        with open(self.path, 'wb') as file:
+            file.write(self.content)
+        self.url = f'{settings.MEDIA_URL}media_test.jpeg'
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_serve_media(self):
+        """Verifies that media files are streamed
+        with their validators.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        response.close()
+
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(f'{settings.MEDIA_URL}missing.jpeg')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(f'{settings.MEDIA_URL}../secret.jpeg')
+        self.assertEqual(response.status_code, 404)
+
+    def test_serve_media_range(self):
+        """Verifies that single byte ranges are served."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            b''.join(response.streaming_content), self.content[10:20]
+        )
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(
+            response['Content-Range'], f'bytes 10-19/{len(self.content)}'
+        )
+        response.close()
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            b''.join(response.streaming_content), self.content[-5:]
+        )
+        response.close()
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+
+        # The whole file is sent when it changed since the range was read.
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"outdated"'
+        )
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_serve_media_accel_redirect(self):
+        """Verifies that nginx is asked to send the file."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/media_test.jpeg'
+        )
+        self.assertEqual(response.content, b'')
+
+    async def test_serve_media_under_asgi(self):
+        """Verifies that under ASGI the files are read in the view
+        instead of being streamed by the event loop.
+        """
+        client = AsyncClient()
+        response = await client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+
+        response = await client.get(self.url, range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.content[10:20])
+        self.assertEqual(
+            response['Content-Range'], f'bytes 10-19/{len(self.content)}'
+        )
+
+        with override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = await client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/media_test.jpeg'
+        )
@@ -1,12 +1,23 @@
 """Post model tests."""
 
 # Django
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 
 # Models
 from posts.models import Post, Comment
+from users.models import Profile
+
+# Serializers
+from posts.serializers import PostModelSerializer
 
 # Utils
+from posts import buffers
+from posts.buffers import flush_likes
+from io import StringIO
+from unittest import mock
+import tempfile
 from utils.tests import create_users
 
 
@@ -55,6 +66,123 @@ class PostModelTestCase(TestCase):
         self.assertFalse(post.likes.filter(pk=user_1.pk).exists())
         self.assertFalse(post.likes.filter(pk=user_2.pk).exists())
 
+    def test_like_counter_is_atomic(self):
+        """Verifies that 'add_like' and 'remove_like' report whether
+        the state changed and only update the 'likes_quantity' and
+        'modified' columns.
+        """
+        user_1, user_2, _ = self.users
+
+        post = Post.objects.create(user=user_1, caption='Caption')
+        modified = post.modified
+        stale_post = Post.objects.get(pk=post.pk)
+        stale_post.caption = 'Stale caption'
+
+        self.assertTrue(post.add_like(user_1))
+        self.assertFalse(post.add_like(user_1))
+        self.assertTrue(stale_post.add_like(user_2))
+
+        post.refresh_from_db()
+        self.assertEqual(post.likes_quantity, 2)
+        self.assertEqual(post.caption, 'Caption')
+        self.assertGreater(post.modified, modified)
+
+        self.assertTrue(post.remove_like(user_1))
+        self.assertFalse(stale_post.remove_like(user_1))
+
+        post.refresh_from_db()
+        self.assertEqual(post.likes_quantity, 1)
+        self.assertEqual(post.likes.count(), 1)
+
+    @override_settings(LIKES_WRITE_BEHIND=True)
+    def test_buffered_likes(self):
+        """Verifies that the likes are buffered until they are flushed
+        and that the serializer shows the buffered value meanwhile.
+        """
+        cache.clear()
+        user_1, user_2, user_3 = self.users
+
+        post = Post.objects.create(user=user_1)
+        comment = Comment.objects.create(user=user_1, post=post)
+        post.add_like(user_1)
+        post.add_like(user_2)
+        post.add_like(user_3)
+        post.remove_like(user_3)
+        comment.add_like(user_1)
+
+        post = Post.objects.get(pk=post.pk)
+        self.assertEqual(post.likes_quantity, 0)
+        self.assertEqual(post.likes.count(), 2)
+        self.assertEqual(PostModelSerializer(post).data['likes_quantity'], 2)
+        posts = PostModelSerializer(
+            Post.objects.filter(pk=post.pk), many=True
+        ).data
+        self.assertEqual(posts[0]['likes_quantity'], 2)
+
+        self.assertEqual(flush_likes(), 2)
+
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(post.likes_quantity, 2)
+        self.assertEqual(comment.likes_quantity, 1)
+        self.assertEqual(PostModelSerializer(post).data['likes_quantity'], 2)
+
+        post.add_like(user_3)
+        self.assertEqual(flush_likes(), 1)
+        self.assertEqual(flush_likes(), 0)
+
+        post.refresh_from_db()
+        self.assertEqual(post.likes_quantity, 3)
+
+    @override_settings(LIKES_WRITE_BEHIND=True)
+    def test_flush_waits_for_unregistered_slots(self):
+        """Verifies that the flusher doesn't skip a sequence number
+        whose writer hasn't registered its object yet.
+        """
+        cache.clear()
+        user_1, user_2, _ = self.users
+        post = Post.objects.create(user=user_1)
+        comment = Comment.objects.create(user=user_1, post=post)
+
+        # A writer took a number but didn't register the post yet.
+        post.add_like(user_1)
+        cache.delete(buffers._dirty_key(cache.get(buffers.SEQUENCE_KEY)))
+        comment.add_like(user_1)
+        self.assertEqual(flush_likes(), 0)
+
+        cache.set(buffers._dirty_key(1), ('posts.post', post.pk))
+        self.assertEqual(flush_likes(), 2)
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(post.likes_quantity, 1)
+        self.assertEqual(comment.likes_quantity, 1)
+
+        # A writer which never registers its object is skipped.
+        post.add_like(user_2)
+        cache.delete(buffers._dirty_key(cache.get(buffers.SEQUENCE_KEY)))
+        with mock.patch('posts.buffers.SLOT_GRACE', 0):
+            self.assertEqual(flush_likes(), 0)
+        self.assertIsNone(cache.get(buffers._missing_key(3)))
+
+    @override_settings(
+        LIKES_WRITE_BEHIND=True,
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.mkdtemp()
+        }}
+    )
+    def test_likes_are_not_buffered_in_unshared_cache(self):
+        """Verifies that the likes are written directly when the
+        cache backend has no atomic counters shared by the processes.
+        """
+        user_1, _, _ = self.users
+        post = Post.objects.create(user=user_1)
+        post.add_like(user_1)
+
+        post.refresh_from_db()
+        self.assertEqual(post.likes_quantity, 1)
+        self.assertEqual(flush_likes(), 0)
+
     def test_add_comment(self):
         user_1, user_2, _ = self.users
         CONTENT = 'Test comment content'
@@ -95,3 +223,74 @@ class PostModelTestCase(TestCase):
 
         self.assertFalse(Comment.objects.filter(user=user_1).exists())
         self.assertEqual(Comment.objects.filter(user=user_2).count(), 1)
+
+    def test_reconcile_counters(self):
+        """Verifies that the drifted counters are fixed
+        and reported.
+        """
+        user_1, user_2, user_3 = self.users
+        posts = [Post.objects.create(user=user_1) for _ in range(3)]
+        posts[0].add_like(user_1)
+        posts[0].add_like(user_2)
+        comment = posts[1].add_comment(user_2, 'Nice')
+        comment.add_like(user_3)
+        user_1.profile.following.add(user_2)
+        Post.objects.update(likes_quantity=7, comments_quantity=0)
+        Comment.objects.update(likes_quantity=0)
+
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn(
+            'post.likes_quantity: checked 3, drifted 3, total drift 19.',
+            out.getvalue()
+        )
+        self.assertEqual(Post.objects.get(pk=posts[0].pk).likes_quantity, 7)
+
+        out = StringIO()
+        call_command('reconcile_counters', '--batch-size', '2', stdout=out)
+        self.assertIn(
+            'post.comments_quantity: checked 3, drifted 1, total drift 1.',
+            out.getvalue()
+        )
+        self.assertIn(
+            'profile.following_quantity: checked 3, drifted 1',
+            out.getvalue()
+        )
+        self.assertEqual(
+            [p.likes_quantity for p in Post.objects.order_by('pk')],
+            [2, 0, 0]
+        )
+        self.assertEqual(Post.objects.get(pk=posts[1].pk).comments_quantity, 1)
+        self.assertEqual(Comment.objects.get(pk=comment.pk).likes_quantity, 1)
+        self.assertEqual(
+            Profile.objects.get(user=user_1).following_quantity, 1
+        )
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertNotIn('drifted 1', out.getvalue())
+
+    @override_settings(LIKES_WRITE_BEHIND=True)
+    def test_reconcile_buffered_counters(self):
+        """Verifies that a like buffered after the initial flush
+        isn't counted by the reconciliation and the flush both.
+        """
+        cache.clear()
+        user_1, user_2, _ = self.users
+        post = Post.objects.create(user=user_1)
+        post.add_like(user_1)
+
+        def flush_and_like():
+            flush_likes()
+            post.add_like(user_2)
+
+        with mock.patch(
+            'posts.buffers.flush_likes', side_effect=flush_and_like
+        ):
+            call_command('reconcile_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.likes_quantity, 1)
+
+        flush_likes()
+        post.refresh_from_db()
+        self.assertEqual(post.likes_quantity, 2)
@@ -6,16 +6,32 @@ from rest_framework.reverse import reverse_lazy
 
 # Django
 from django.contrib.staticfiles.testing import StaticLiveServerTestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import AsyncClient, override_settings
+from django.utils import timezone
+
+# Simple JWT
+from rest_framework_simplejwt.tokens import AccessToken
 
 # Models
-from posts.models import Post, Comment
+from posts.models import Comment, ImageBlob, Post
+from users.models import User
 
 # Utils
+from asgiref.sync import sync_to_async
+from posts import timelines
+from posts.publication import publish_pending_posts
+from utils import caching
+from utils.classification import verdict_cache
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+import tempfile
 from utils.tests import (
     create_users,
     create_data_list,
 )
-import os
 
 
 class StaticLiveServerPostViewsTestCase(StaticLiveServerTestCase):
@@ -50,6 +66,119 @@ class StaticLiveServerPostViewsTestCase(StaticLiveServerTestCase):
 
         self.assertEqual(post.caption, data_list['caption'])
         self.assertIn('.jpeg', post.image.url)
+        self.assertEqual(post.classification_status, 'approved')
+        self.assertTrue(post.is_active)
+
+    @override_settings(
+        ASUKA_CLASSIFIER='tests.posts.test_classification.SlowClassifier',
+        ASUKA_CLASSIFICATION_MAX_ATTEMPTS=2,
+        ASUKA_CLASSIFICATION_RETRY_DELAY=60
+    )
+    def test_create_unclassified_post(self):
+        """Verifies that a post whose image can't be classified
+        stays pending and is retried with backoff.
+        """
+        verdict_cache.clear()
+        user_1, _, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        data = create_data_list(1)[0]
+        c1 = APIClient()
+        c1.force_authenticate(user=user_1)
+        response = c1.post(self.create_post_url, data)
+        data['image'].close()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['classification_status'], 'pending')
+
+        post = Post.objects.get(user=user_1)
+
+        self.assertFalse(post.is_active)
+        self.assertEqual(post.classification_attempts, 1)
+        self.assertGreater(
+            post.next_classification, timezone.now() + timedelta(seconds=50)
+        )
+        self.assertEqual(c1.get(self.create_post_url).json()['results'], [])
+
+        # It isn't due yet.
+        self.assertEqual(publish_pending_posts(), 0)
+
+        Post.objects.filter(pk=post.pk).update(
+            next_classification=timezone.now()
+        )
+        self.assertEqual(publish_pending_posts(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.classification_attempts, 2)
+        self.assertIsNone(post.next_classification)
+        self.assertEqual(post.classification_status, 'pending')
+
+        Post.objects.filter(pk=post.pk).update(
+            next_classification=timezone.now()
+        )
+        with override_settings(ASUKA_CLASSIFIER='utils.tests.FakeClassifier'):
+            call_command('publish_pending_posts', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(post.is_active)
+        self.assertEqual(post.classification_status, 'approved')
+
+    def test_create_post_orphaned_by_restart(self):
+        """Verifies that a new post whose background publication
+        never ran is published by the pending posts sweep.
+        """
+        user_1, _, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        data = create_data_list(1)[0]
+        c1 = APIClient()
+        c1.force_authenticate(user=user_1)
+        with mock.patch('posts.serializers.posts.publish_post'):
+            response = c1.post(self.create_post_url, data)
+        data['image'].close()
+
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(user=user_1)
+        self.assertFalse(post.is_active)
+        self.assertGreater(post.next_classification, timezone.now())
+
+        # The lease of the lost worker expires.
+        Post.objects.filter(pk=post.pk).update(
+            next_classification=timezone.now()
+        )
+        self.assertEqual(publish_pending_posts(), 1)
+        post.refresh_from_db()
+        self.assertTrue(post.is_active)
+        self.assertIsNone(post.next_classification)
+
+    def test_create_post_in_renaming_storage(self):
+        """Verifies that the renditions are referenced by the name
+        the storage saved them under.
+        """
+        user_1, _, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        data = create_data_list(1)[0]
+        c1 = APIClient()
+        c1.force_authenticate(user=user_1)
+        with mock.patch(
+            'django.core.files.storage.FileSystemStorage.get_available_name',
+            lambda storage, name, max_length=None: name.replace(
+                '.', '_saved.'
+            )
+        ):
+            response = c1.post(self.create_post_url, data)
+        data['image'].close()
+
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(user=user_1)
+        storage = post.image.storage
+        for files in post.image_renditions.values():
+            for _, file_name in files:
+                self.assertIn('_saved.', file_name)
+                self.assertTrue(storage.exists(file_name))
+                self.assertTrue(
+                    ImageBlob.objects.filter(stored_name=file_name).exists()
+                )
+        self.assertTrue(storage.exists(post.image.name))
 
 
 class PostViewsAPITestCase(APITestCase):
@@ -60,6 +189,33 @@ class PostViewsAPITestCase(APITestCase):
         self.like_post_url = reverse_lazy('posts:posts-like')
         self.users, _ = create_users()
 
+    def create_read_data(self):
+        user_1, user_2, _ = self.users
+        User.objects.update(is_verified=True)
+        post = Post.objects.create(user=user_2)
+        Comment.objects.create(user=user_1, post=post)
+        token = AccessToken.for_user(user_1)
+        token['is_verified'] = token['is_client'] = True
+        return post, token
+
+    async def test_read_endpoints_under_asgi(self):
+        """Verifies that the read endpoints are
+        served by the ASGI application.
+        """
+        post, token = await sync_to_async(self.create_read_data)()
+        client = AsyncClient()
+        urls = [
+            self.list_post_url,
+            reverse_lazy('posts:posts-detail', args=[post.pk]),
+            reverse_lazy('posts:posts-comments', args=[post.pk]),
+            reverse_lazy('users:users-list'),
+            reverse_lazy('users:users-detail', args=[post.user_id]),
+            reverse_lazy('users:users-posts', args=[post.user_id]),
+        ]
+        for url in urls:
+            response = await client.get(url, authorization=f'Bearer {token}')
+            self.assertEqual(response.status_code, 200, url)
+
     def test_list_posts(self):
         """Verifies that all the posts can be listed."""
         user_1, _, _ = self.users
@@ -79,7 +235,7 @@ class PostViewsAPITestCase(APITestCase):
 
         user_1.is_verified = True
         user_1.save()
-        response = c.get(self.list_post_url)
+        response = c.get(self.list_post_url, {'offset': 0})
 
         self.assertEqual(response.status_code, 200)
 
@@ -92,7 +248,7 @@ class PostViewsAPITestCase(APITestCase):
         post_1.is_active = False
         post_1.save()
 
-        response = c.get(self.list_post_url)
+        response = c.get(self.list_post_url, {'offset': 0})
 
         self.assertEqual(response.status_code, 200)
 
@@ -101,6 +257,194 @@ class PostViewsAPITestCase(APITestCase):
         self.assertEqual(len(response['results']), 2)
         self.assertEqual(response['count'], 2)
 
+    def test_list_posts_cursor_pagination(self):
+        """Verifies that the posts are paginated by cursor
+        when the client does not ask for an offset.
+        """
+        user_1, _, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        c = APIClient()
+        c.force_authenticate(user=user_1)
+        posts = [Post.objects.create(user=user_1) for _ in range(5)]
+        Post.objects.filter(pk__in=[p.pk for p in posts]).update(
+            created=posts[0].created
+        )
+
+        response = c.get(self.list_post_url, {'limit': 2})
+
+        self.assertEqual(response.status_code, 200)
+
+        response = response.json()
+
+        self.assertNotIn('count', response)
+        self.assertEqual(len(response['results']), 2)
+
+        listed_pks = [p['pk'] for p in response['results']]
+        while response['next']:
+            response = c.get(response['next']).json()
+            listed_pks += [p['pk'] for p in response['results']]
+
+        self.assertEqual(listed_pks, [p.pk for p in reversed(posts)])
+
+        response = c.get(self.list_post_url, {'cursor': 'invalid'})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_posts_query_count(self):
+        """Verifies that listing posts and comments performs
+        a fixed number of queries regardless of the page size.
+        """
+        user_1, user_2, user_3 = self.users
+        user_1.is_verified = True
+        user_1.save()
+        c = APIClient()
+        c.force_authenticate(user=user_1)
+        for user in self.users:
+            post = Post.objects.create(user=user)
+            post.likes.add(user_1)
+            for comment_user in self.users:
+                Comment.objects.create(user=comment_user, post=post)
+        list_post_comments_url = reverse_lazy(
+            'posts:posts-comments', args=[post.pk]
+        )
+
+        with self.assertNumQueries(1):
+            response = c.get(self.list_post_url)
+        self.assertEqual(len(response.json()['results']), 3)
+
+        with self.assertNumQueries(2):
+            response = c.get(self.list_post_url, {'offset': 0})
+        self.assertEqual(len(response.json()['results']), 3)
+
+        with self.assertNumQueries(1):
+            response = c.get(reverse_lazy('posts:posts-liked'))
+        self.assertEqual(len(response.json()['results']), 3)
+
+        with self.assertNumQueries(2):
+            response = c.get(list_post_comments_url)
+        self.assertEqual(len(response.json()['results']), 3)
+
+    def test_liked_by_me(self):
+        """Verifies that the posts and comments tell whether the
+        request user liked them without extra queries.
+        """
+        user_1, user_2, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        c = APIClient()
+        c.force_authenticate(user=user_1)
+        posts = [Post.objects.create(user=user_2) for _ in range(3)]
+        posts[1].add_like(user_1)
+        posts[2].add_like(user_2)
+        comments = [
+            Comment.objects.create(user=user_2, post=posts[0])
+            for _ in range(2)
+        ]
+        comments[0].add_like(user_1)
+
+        with self.assertNumQueries(1):
+            response = c.get(self.list_post_url)
+        liked = {
+            post['pk']: post['liked_by_me']
+            for post in response.json()['results']
+        }
+        self.assertEqual(
+            liked, {posts[0].pk: False, posts[1].pk: True, posts[2].pk: False}
+        )
+
+        response = c.get(
+            reverse_lazy('posts:posts-comments', args=[posts[0].pk])
+        )
+        liked = {
+            comment['pk']: comment['liked_by_me']
+            for comment in response.json()['results']
+        }
+        self.assertEqual(
+            liked, {comments[0].pk: True, comments[1].pk: False}
+        )
+
+        response = APIClient().get(
+            reverse_lazy('posts:posts-detail', args=[posts[1].pk])
+        )
+        self.assertFalse(response.json()['liked_by_me'])
+
+    def test_feed(self):
+        """Verifies that the feed lists only the posts of the followed
+        users and that the timelines are updated on write.
+        """
+        cache.clear()
+        user_1, user_2, user_3 = self.users
+        user_1.profile.start_follow(user_2)
+        User.objects.update(is_verified=True)
+        user_1.refresh_from_db()
+        c1 = APIClient()
+        c1.force_authenticate(user=user_1)
+        feed_url = reverse_lazy('posts:posts-feed')
+        post_1 = Post.objects.create(user=user_2)
+        Post.objects.create(user=user_3)
+
+        response = c1.get(feed_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [p['pk'] for p in response.json()['results']], [post_1.pk]
+        )
+
+        post_2 = Post.objects.create(user=user_2)
+        timelines.push_post(post_2)
+        response = c1.get(feed_url)
+
+        self.assertEqual(
+            [p['pk'] for p in response.json()['results']],
+            [post_2.pk, post_1.pk]
+        )
+
+        c2 = APIClient()
+        c2.force_authenticate(user=User.objects.get(pk=user_2.pk))
+        response = c2.delete(
+            reverse_lazy('posts:posts-detail', args=[post_2.pk])
+        )
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(timelines.get_timeline(user_1), [post_1.pk])
+
+        # A timeline locked by another writer is dropped.
+        key = timelines._timeline_key(user_1.pk)
+        cache.add(timelines._lock_key(key), True)
+        timelines.push_post(post_2)
+        self.assertIsNone(cache.get(key))
+        cache.clear()
+
+        # A post published while the timeline is rebuilt isn't lost.
+        build_timeline = timelines._build_timeline
+
+        def build_and_publish(user):
+            timeline = build_timeline(user)
+            timelines.push_post(post_4)
+            return timeline
+
+        post_4 = Post.objects.create(user=user_2)
+        with mock.patch(
+            'posts.timelines._build_timeline', side_effect=build_and_publish
+        ):
+            timelines.get_timeline(user_1)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(timelines.get_timeline(user_1)[0], post_4.pk)
+        cache.clear()
+
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.mkdtemp()
+        }}):
+            post_3 = Post.objects.create(user=user_2)
+            response = c1.get(feed_url)
+            self.assertEqual(
+                [p['pk'] for p in response.json()['results']],
+                [post_3.pk, post_4.pk, post_1.pk]
+            )
+            self.assertIsNone(cache.get(key))
+
     def test_retrieve_post(self):
         """Verifies that a post can be retrieved."""
         user_1, _, _ = self.users
@@ -119,6 +463,125 @@ class PostViewsAPITestCase(APITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['pk'], post.pk)
 
+    def test_retrieve_post_cache(self):
+        """Verifies that anonymous responses are cached and
+        invalidated when the post or its author change.
+        """
+        user_1, user_2, _ = self.users
+        post = Post.objects.create(user=user_1, caption='First')
+        retrieve_post_url = reverse_lazy('posts:posts-detail', args=[post.pk])
+        c1 = APIClient()
+        metrics = caching.get_metrics()
+
+        response = c1.get(retrieve_post_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Accept', response['Vary'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = c1.get(retrieve_post_url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json()['caption'], 'First')
+        self.assertEqual(response['ETag'], etag)
+
+        response = c1.get(retrieve_post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.assertEqual(caching.get_metrics(), {
+            'hits': metrics['hits'] + 2,
+            'misses': metrics['misses'] + 1,
+        })
+
+        user_1.first_name = 'Author'
+        user_1.save()
+        response = c1.get(retrieve_post_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['user']['first_name'], 'Author')
+        etag = response['ETag']
+
+        post.add_like(user_2)
+        response = c1.get(retrieve_post_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['likes_quantity'], 1)
+        self.assertNotEqual(response['ETag'], etag)
+
+        post.caption = 'Second'
+        post.save()
+        response = c1.get(retrieve_post_url)
+        self.assertEqual(response.json()['caption'], 'Second')
+
+        post.is_active = False
+        post.save()
+        response = c1.get(retrieve_post_url)
+        self.assertEqual(response.status_code, 404)
+
+        post = Post.objects.create(user=user_1)
+        c1.force_authenticate(user=user_1)
+        response = c1.get(
+            reverse_lazy('posts:posts-detail', args=[post.pk])
+        )
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('X-Cache', response)
+
+    def test_conditional_get(self):
+        """Verifies that unchanged posts are answered with 304
+        without serializing them, and that changes update the ETag.
+        """
+        user_1, user_2, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        post = Post.objects.create(user=user_2)
+        retrieve_post_url = reverse_lazy('posts:posts-detail', args=[post.pk])
+        c1 = APIClient()
+        c1.force_authenticate(user=user_1)
+
+        response = c1.get(self.list_post_url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = c1.get(self.list_post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        post.add_like(user_1)
+        response = c1.get(self.list_post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'][0]['liked_by_me'])
+        self.assertNotEqual(response['ETag'], etag)
+        list_etag = response['ETag']
+
+        response = c1.get(retrieve_post_url)
+        last_modified = response['Last-Modified']
+        response = c1.get(
+            retrieve_post_url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # Renaming the author changes the serialized posts.
+        etag = response['ETag']
+        user_2.username = 'renamed'
+        user_2.save()
+        response = c1.get(retrieve_post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = c1.get(
+            self.list_post_url, HTTP_IF_NONE_MATCH=list_etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['results'][0]['user']['username'], 'renamed'
+        )
+
+        # Other users get other validators.
+        c2 = APIClient()
+        c2.force_authenticate(user=user_2)
+        response = c2.get(
+            retrieve_post_url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+
     def test_update_post(self):
         """Verifies that the post's 'caption' attribute
         can be updated.
@@ -246,6 +709,12 @@ class PostViewsAPITestCase(APITestCase):
         response = c2.post(like_post_c1_url)
 
         self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()['changed'])
+
+        response = c2.post(like_post_c1_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['changed'])
         self.assertEqual(post.likes.count(), 2)
         self.assertTrue(post.likes.filter(pk=user_1.pk).exists())
         self.assertTrue(post.likes.filter(pk=user_2.pk).exists())
@@ -257,7 +726,13 @@ class PostViewsAPITestCase(APITestCase):
         response = c2.delete(like_post_c1_url)
 
         self.assertEqual(response.status_code, 204)
+
+        response = c2.delete(like_post_c1_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['changed'])
         self.assertEqual(post.likes.count(), 0)
+        self.assertEqual(Post.objects.get(pk=post.pk).likes_quantity, 0)
         self.assertFalse(post.likes.filter(pk=user_1.pk).exists())
         self.assertFalse(post.likes.filter(pk=user_2.pk).exists())
 
@@ -272,6 +747,87 @@ class PostViewsAPITestCase(APITestCase):
 
         self.assertEqual(response.status_code, 404)
 
+    def test_like_posts_batch(self):
+        """Verifies that many posts can be liked and
+        unliked with one request.
+        """
+        user_1, user_2, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        c1 = APIClient()
+        c1.force_authenticate(user=user_1)
+        batch_url = reverse_lazy('posts:posts-like-batch')
+        posts = [Post.objects.create(user=user_2) for _ in range(4)]
+        posts[2].add_like(user_1)
+        posts[3].add_like(user_1)
+        inactive = Post.objects.create(user=user_2, is_active=False)
+
+        # Validation, the lock of the posts, current likes, insert,
+        # delete, two counter updates, the savepoint around them and
+        # the authors of the changed posts for the response cache.
+        with self.assertNumQueries(10):
+            response = c1.post(batch_url, {'operations': [
+                {'pk': posts[0].pk, 'action': 'like'},
+                {'pk': posts[1].pk, 'action': 'like'},
+                {'pk': posts[1].pk, 'action': 'unlike'},
+                {'pk': posts[2].pk, 'action': 'unlike'},
+                {'pk': posts[3].pk, 'action': 'like'},
+                {'pk': inactive.pk, 'action': 'like'},
+                {'pk': 999, 'action': 'unlike'},
+            ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'liked': [posts[0].pk],
+            'unliked': [posts[2].pk],
+            'unchanged': [posts[1].pk, posts[3].pk],
+            'not_found': [inactive.pk, 999],
+        })
+        self.assertEqual(
+            [
+                p.likes_quantity
+                for p in Post.objects.filter(
+                    pk__in=[p.pk for p in posts]
+                ).order_by('pk')
+            ],
+            [1, 0, 0, 1]
+        )
+        self.assertEqual(
+            set(user_1.post_likes.values_list('pk', flat=True)),
+            {posts[0].pk, posts[3].pk}
+        )
+
+        response = c1.post(batch_url, {'operations': [
+            {'pk': posts[0].pk, 'action': 'love'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_like_comments_batch(self):
+        """Verifies that many comments can be liked with one request."""
+        user_1, user_2, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        c1 = APIClient()
+        c1.force_authenticate(user=user_1)
+        post = Post.objects.create(user=user_2)
+        comments = [
+            Comment.objects.create(user=user_2, post=post) for _ in range(2)
+        ]
+
+        response = c1.post(
+            reverse_lazy('posts:comments-like-batch'),
+            {'operations': [
+                {'pk': comment.pk, 'action': 'like'} for comment in comments
+            ]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['liked'], [c.pk for c in comments])
+        for comment in comments:
+            comment.refresh_from_db()
+            self.assertEqual(comment.likes_quantity, 1)
+
     def test_list_liked_posts(self):
         """Verify that the posts
         liked by a user can be listed.
@@ -406,7 +962,7 @@ class PostViewsAPITestCase(APITestCase):
         list_post_comments_url = reverse_lazy(
             'posts:posts-comments', args=[post_1.pk]
         )
-        response = c1.get(list_post_comments_url)
+        response = c1.get(list_post_comments_url, {'offset': 0})
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.json()['results']), 2)
@@ -474,3 +1030,19 @@ class PostViewsAPITestCase(APITestCase):
         response = c2.delete(like_comment_c1_url)
 
         self.assertEqual(response.status_code, 404)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp()
+    }})
+    def test_responses_are_not_cached_in_unshared_cache(self):
+        """Verifies that the responses aren't cached when the
+        cache backend has no atomic counters shared by the processes.
+        """
+        user_1, _, _ = self.users
+        post = Post.objects.create(user=user_1)
+        response = APIClient().get(
+            reverse_lazy('posts:posts-detail', args=[post.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Cache', response)
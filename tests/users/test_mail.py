@@ -0,0 +1,152 @@
+"""Email queue tests."""
+
+# Django
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+# Models
+from users.models import QueuedEmail
+
+# Utils
+from utils.mail import (
+    enqueue_email,
+    get_email_templates,
+    render_email,
+    send_queued_emails,
+)
+from utils.models import EmailStatus
+from datetime import timedelta
+from io import StringIO
+
+
+class FlakyEmailBackend(EmailBackend):
+    """Locmem backend which counts its connections and
+    fails to send to the `fail@test.com` recipient.
+
+    Its connections can't be opened while `refused` is set.
+    """
+
+    opened = 0
+    refused = False
+
+    def open(self):
+        if FlakyEmailBackend.refused:
+            raise ConnectionRefusedError('Connection refused.')
+        FlakyEmailBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'fail@test.com' in message.to:
+                raise ConnectionError('Recipient refused.')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='tests.users.test_mail.FlakyEmailBackend',
+    EMAIL_QUEUE_MAX_ATTEMPTS=2,
+    EMAIL_QUEUE_RETRY_DELAY=60
+)
+class EmailQueueTestCase(TestCase):
+    """Email queue test case."""
+
+    def setUp(self):
+        FlakyEmailBackend.opened = 0
+        FlakyEmailBackend.refused = False
+
+    def test_emails_are_sent_in_batches(self):
+        """Verifies that queued emails are sent in batches
+        through one connection.
+        """
+        for i in range(5):
+            enqueue_email(
+                f'Subject {i}', 'Text', [f'user{i}@test.com'],
+                html_body='<p>HTML</p>'
+            )
+
+        self.assertEqual(send_queued_emails(batch_size=3).sent, 3)
+        self.assertEqual(FlakyEmailBackend.opened, 1)
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            ['Subject 0', 'Subject 1', 'Subject 2']
+        )
+        self.assertEqual(
+            mail.outbox[0].alternatives, [('<p>HTML</p>', 'text/html')]
+        )
+
+        call_command('send_queued_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(
+            QueuedEmail.objects.exclude(status=EmailStatus.SENT).exists()
+        )
+        self.assertEqual(send_queued_emails().sent, 0)
+
+    def test_failed_emails_are_retried(self):
+        """Verifies that failed emails are retried with
+        backoff until the maximum attempts.
+        """
+        failing = enqueue_email('Failing', 'Text', ['fail@test.com'])
+        enqueue_email('Sent', 'Text', ['user@test.com'])
+
+        delivery = send_queued_emails()
+        self.assertEqual((delivery.sent, delivery.retried), (1, 1))
+        self.assertEqual(len(mail.outbox), 1)
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, EmailStatus.PENDING)
+        self.assertEqual(failing.attempts, 1)
+        self.assertIn('Recipient refused', failing.last_error)
+        self.assertGreater(
+            failing.next_attempt, timezone.now() + timedelta(seconds=50)
+        )
+
+        # It isn't due yet.
+        self.assertEqual(sum(send_queued_emails()), 0)
+
+        QueuedEmail.objects.filter(pk=failing.pk).update(
+            next_attempt=timezone.now()
+        )
+        self.assertEqual(send_queued_emails().failed, 1)
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, EmailStatus.FAILED)
+        self.assertEqual(failing.attempts, 2)
+
+    def test_emails_are_retried_when_connection_fails(self):
+        """Verifies that the emails which couldn't be sent because
+        the connection failed count the attempt and back off.
+        """
+        email = enqueue_email('Subject', 'Text', ['user@test.com'])
+        FlakyEmailBackend.refused = True
+
+        delivery = send_queued_emails()
+        self.assertEqual((delivery.sent, delivery.retried), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailStatus.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('Connection refused', email.last_error)
+        self.assertGreater(
+            email.next_attempt, timezone.now() + timedelta(seconds=50)
+        )
+        self.assertEqual(sum(send_queued_emails()), 0)
+
+    def test_render_email(self):
+        """Verifies that the email templates are compiled once and
+        rendered into separate text and HTML bodies.
+        """
+        context = {
+            'username': 'user<1>',
+            'verify_url': 'http://localhost/api/users/verify/?token=a&b',
+        }
+        render_email('account_verification', context)
+        misses = get_email_templates.cache_info().misses
+
+        text_body, html_body = render_email('account_verification', context)
+        self.assertEqual(get_email_templates.cache_info().misses, misses)
+
+        self.assertIn('Welcome @user<1>!', text_body)
+        self.assertIn(context['verify_url'], text_body.splitlines())
+        self.assertNotIn('<html>', text_body)
+        self.assertIn('Welcome @user&lt;1&gt;!', html_body)
+        self.assertIn('?token=a&amp;b', html_body)
@@ -1,9 +1,16 @@
 """User profile tests."""
 
 # Django
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
 
+# Models
+from users.models import Follow, Profile, User
+
 # Utils
+from io import StringIO
+from users.management.commands.copy_legacy_follows import LEGACY_TABLES
 from utils.tests import create_users
 
 
@@ -46,3 +53,92 @@ class UserProfileModelTestCase(TestCase):
  
         self.assertEqual(user_2.profile.followers_quantity, 0)
         self.assertEqual(user_3.profile.followers_quantity, 0)
+
+    def test_follow_is_stored_once(self):
+        """Verifies that a relationship is stored as one edge and
+        that repeating a follow or unfollow doesn't change the counters.
+        """
+        user_1, user_2, _ = self.users
+        User.objects.filter(pk=user_2.pk).update(is_verified=True)
+
+        self.assertTrue(user_1.profile.start_follow(user_2))
+        self.assertFalse(user_1.profile.start_follow(user_2))
+
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(list(user_2.followers.all()), [user_1])
+        self.assertEqual(
+            Profile.objects.get(user=user_1).following_quantity, 1
+        )
+        self.assertEqual(
+            Profile.objects.get(user=user_2).followers_quantity, 1
+        )
+        # The followed user isn't saved with stale values.
+        user_2.refresh_from_db()
+        self.assertTrue(user_2.is_verified)
+
+        self.assertTrue(user_1.profile.stop_following(user_2))
+        self.assertFalse(user_1.profile.stop_following(user_2))
+
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            Profile.objects.get(user=user_1).following_quantity, 0
+        )
+        self.assertEqual(
+            Profile.objects.get(user=user_2).followers_quantity, 0
+        )
+
+    def test_copy_legacy_follows(self):
+        """Verifies that the follows of the legacy profile tables
+        are copied once and the counters are fixed.
+        """
+        user_1, user_2, user_3 = self.users
+        user_1.profile.start_follow(user_2)
+        with connection.cursor() as cursor:
+            for table in LEGACY_TABLES:
+                cursor.execute(
+                    f'CREATE TABLE {table} (id integer PRIMARY KEY, '
+                    'profile_id integer, user_id integer)'
+                )
+            # Both tables stored each follow, from both sides.
+            cursor.executemany(
+                'INSERT INTO users_profile_following (profile_id, user_id) '
+                'VALUES (%s, %s)',
+                [
+                    (user_1.profile.pk, user_2.pk),
+                    (user_1.profile.pk, user_3.pk),
+                    (user_3.profile.pk, user_2.pk),
+                ]
+            )
+            cursor.executemany(
+                'INSERT INTO users_profile_followers (profile_id, user_id) '
+                'VALUES (%s, %s)',
+                [
+                    (user_2.profile.pk, user_1.pk),
+                    (user_3.profile.pk, user_1.pk),
+                    (user_2.profile.pk, user_3.pk),
+                ]
+            )
+
+        out = StringIO()
+        call_command('copy_legacy_follows', '--batch-size', '2', stdout=out)
+        self.assertIn(
+            'users_profile_following: copied 2 follows.', out.getvalue()
+        )
+        self.assertIn(
+            'users_profile_followers: copied 0 follows.', out.getvalue()
+        )
+
+        self.assertEqual(
+            set(Follow.objects.values_list('follower', 'followed')),
+            {
+                (user_1.pk, user_2.pk),
+                (user_1.pk, user_3.pk),
+                (user_3.pk, user_2.pk),
+            }
+        )
+        self.assertEqual(
+            Profile.objects.get(user=user_1).following_quantity, 2
+        )
+        self.assertEqual(
+            Profile.objects.get(user=user_2).followers_quantity, 2
+        )
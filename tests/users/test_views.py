@@ -4,20 +4,36 @@
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.core import mail
+from django.core.management import call_command
 
 # REST Framework
 from rest_framework.test import APITestCase, APIClient
 from rest_framework.reverse import reverse_lazy
 
+# Simple JWT
+from rest_framework_simplejwt.tokens import AccessToken
+
 # Models
-from users.models import User, Profile
-from posts.models import Post
+from users.models import User, Profile, UserSearchToken
+from posts.models import ImageBlob, Post
 
 # Utils
+from users.authentication import (
+    ExpiringLRUCache,
+    get_token_claims,
+    get_token_key,
+    revoke_token,
+    token_cache,
+)
 from utils.tests import (
     create_users,
+    create_image,
 )
+from io import StringIO
+from PIL import Image
 import jwt
+import time
+from utils.mail import send_queued_emails
 from utils.serializers import gen_verification_token
 
 
@@ -60,6 +76,9 @@ class UserViewsTestCase(APITestCase):
 
         self.assertTrue(is_logged_in)
 
+        # The email is queued and sent by the mail worker.
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(send_queued_emails().sent, 1)
         self.assertEqual(len(mail.outbox), 1)
 
         email_lines = mail.outbox[0].body.splitlines()
@@ -128,6 +147,94 @@ class UserViewsTestCase(APITestCase):
 
         self.assertEqual(response.status_code, 201)
 
+    def test_token_claims_authentication(self):
+        """Verifies that requests are authenticated with the claims
+        of the access token without loading the user.
+        """
+        user_1, _, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        response = self.client.post(
+            self.token_pair_url,
+            data={
+                'email': user_1.email,
+                'password': self.user_passwords['u1_password']
+            }
+        )
+        access = AccessToken(response.data['access'])
+        refresh = response.data['refresh']
+        self.assertIs(access['is_verified'], True)
+        self.assertIs(access['is_client'], True)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        feed_url = reverse_lazy('posts:posts-list')
+        with self.assertNumQueries(1):
+            response = client.get(feed_url)
+        self.assertEqual(response.status_code, 200)
+
+        # Tokens without the claims load the user.
+        old_access = AccessToken.for_user(user_1)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {old_access}')
+        with self.assertNumQueries(2):
+            response = client.get(feed_url)
+        self.assertEqual(response.status_code, 200)
+
+        # Refreshed tokens carry the current claims.
+        user_1.is_verified = False
+        user_1.save()
+        response = self.client.post(
+            self.token_refresh_url, data={'refresh': refresh}
+        )
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.data['access'])
+        self.assertIs(access['is_verified'], False)
+
+        user_1.is_active = False
+        user_1.save()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = client.patch(
+            reverse_lazy('users:users-profile'), {'biography': 'Inactive'}
+        )
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(
+            self.token_refresh_url, data={'refresh': refresh}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_token_cache(self):
+        """Verifies that validated tokens are cached until they
+        expire or are revoked.
+        """
+        user_1, _, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        access = AccessToken.for_user(user_1)
+        for claim, value in get_token_claims(user_1).items():
+            access[claim] = value
+        raw_token = str(access)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {raw_token}')
+        feed_url = reverse_lazy('posts:posts-list')
+
+        response = client.get(feed_url)
+        self.assertEqual(response.status_code, 200)
+        key = get_token_key(raw_token)
+        self.assertEqual(token_cache.get(key)['jti'], access['jti'])
+
+        revoke_token(raw_token)
+        self.assertIsNone(token_cache.get(key))
+        response = client.get(feed_url)
+        self.assertEqual(response.status_code, 401)
+
+        cache = ExpiringLRUCache(max_size=1, ttl=60)
+        cache.set('expired', True, expires=time.time() - 1)
+        self.assertIsNone(cache.get('expired'))
+        cache.set('a', True)
+        cache.set('b', True)
+        self.assertIsNone(cache.get('a'))
+        self.assertTrue(cache.get('b'))
+
     def test_retrieve_user(self):
         """Verifies that a user can be retrieved."""
         user_1, _, _ = self.users
@@ -181,6 +288,94 @@ class UserViewsTestCase(APITestCase):
         self.assertEqual(len(response.json()['results']), 1)
         self.assertEqual(response.json()['results'][0]['pk'], user_2.pk)
 
+    def test_search_users(self):
+        """Verifies that users are searched by prefix and infix
+        through the search index and ranked by relevance.
+        """
+        user_1, user_2, user_3 = self.users
+        user_1.username = 'annabel'
+        user_1.first_name = 'Joanne'
+        user_1.save()
+        user_2.username = 'joanne_lee'
+        user_2.first_name = 'Ánna'
+        user_2.last_name = 'Lee'
+        user_2.save()
+        User.objects.update(is_verified=True)
+        c1 = APIClient()
+        list_users_url = reverse_lazy('users:users-list')
+
+        def search(text):
+            response = c1.get(list_users_url, {'search': text})
+            self.assertEqual(response.status_code, 200)
+            return [user['pk'] for user in response.json()['results']]
+
+        # Username prefixes rank above name prefixes and infixes.
+        self.assertEqual(search('ann'), [user_1.pk, user_2.pk])
+        self.assertEqual(search('joan'), [user_2.pk, user_1.pk])
+        self.assertEqual(search('anne'), [user_2.pk, user_1.pk])
+        self.assertEqual(search('anna lee'), [user_2.pk])
+        self.assertEqual(search('bel'), [user_1.pk])
+        self.assertEqual(search('zzz'), [])
+
+        # Single letters match nobody instead of everybody.
+        self.assertEqual(search('a'), [])
+        self.assertEqual(search('anna l'), [user_1.pk, user_2.pk])
+
+        response = c1.get(list_users_url, {'search': 'ann', 'limit': 1})
+        self.assertNotIn('count', response.json())
+        self.assertIn('offset=1', response.json()['next'])
+        response = c1.get(response.json()['next'])
+        self.assertEqual(
+            [user['pk'] for user in response.json()['results']],
+            [user_2.pk]
+        )
+        self.assertIsNone(response.json()['next'])
+
+        # Saving a user updates its tokens.
+        user_1.username = 'bob'
+        user_1.save(update_fields=['username'])
+        self.assertEqual(search('annab'), [])
+        self.assertEqual(search('bo'), [user_1.pk])
+
+        UserSearchToken.objects.all().delete()
+        self.assertEqual(search('bob'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search('bob'), [user_1.pk])
+
+    def test_list_users_query_count(self):
+        """Verifies that listing users and their posts performs
+        a fixed number of queries regardless of the page size.
+        """
+        user_1, user_2, user_3 = self.users
+        user_2.profile.start_follow(user_1)
+        user_3.profile.start_follow(user_1)
+        user_1.profile.start_follow(user_2)
+        user_1.profile.start_follow(user_3)
+        User.objects.update(is_verified=True)
+        for _ in range(3):
+            Post.objects.create(user=user_1)
+        c1 = APIClient()
+
+        with self.assertNumQueries(1):
+            response = c1.get(reverse_lazy('users:users-list'))
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertNotIn('count', response.json())
+
+        with self.assertNumQueries(3):
+            response = c1.get(
+                reverse_lazy('users:users-posts', args=[user_1.pk])
+            )
+        self.assertEqual(len(response.json()['results']), 3)
+
+        user_1.refresh_from_db()
+        c1.force_authenticate(user=user_1)
+        for action in ('followers', 'following'):
+            with self.assertNumQueries(3):
+                response = c1.get(
+                    reverse_lazy(f'users:users-{action}', args=[user_1.pk])
+                )
+            self.assertEqual(len(response.json()['results']), 2)
+
     def test_follow(self):
         """Test if be created a follow relationship
         between two users.
@@ -244,6 +439,115 @@ class UserViewsTestCase(APITestCase):
 
         self.assertEqual(profile.biography, partial_update_data['biography'])
 
+    def test_update_profile_picture(self):
+        """Verifies that the profile picture is compressed
+        after being stored.
+        """
+        user_1, _, _ = self.users
+        user_1.is_verified = True
+        user_1.save()
+        c1 = APIClient()
+        c1.force_authenticate(user=user_1)
+        update_profile_url = reverse_lazy('users:users-profile')
+        with create_image(size=(1200, 900)) as picture:
+            response = c1.patch(update_profile_url, data={'picture': picture})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['picture_status'], 'ready')
+
+        profile = Profile.objects.get(user=user_1)
+
+        self.assertEqual(profile.picture_status, 'ready')
+        self.assertTrue(profile.picture.name.endswith('.jpeg'))
+        with Image.open(profile.picture) as image:
+            self.assertEqual(image.size, (600, 450))
+
+        sizes = {
+            'thumbnail': (96, 72),
+            'medium': (300, 225),
+            'full': (600, 450),
+        }
+        self.assertEqual(set(profile.picture_renditions), set(sizes))
+        for name, size in sizes.items():
+            files = dict(profile.picture_renditions[name])
+            self.assertIn('jpeg', files)
+            self.assertIn('webp', files)
+            for file_name in files.values():
+                with profile.picture.storage.open(file_name) as image:
+                    self.assertEqual(Image.open(image).size, size)
+
+        response = c1.get(reverse_lazy('users:users-list'))
+        pictures = response.json()['results'][0]['picture']
+
+        self.assertEqual(set(pictures), set(sizes))
+        self.assertTrue(pictures['thumbnail'].startswith('http://testserver/'))
+        self.assertTrue(pictures['thumbnail'].endswith('.jpeg'))
+
+        response = c1.get(
+            reverse_lazy('users:users-list'),
+            HTTP_ACCEPT='application/json, image/webp'
+        )
+        pictures = response.json()['results'][0]['picture']
+
+        self.assertTrue(pictures['thumbnail'].endswith('.webp'))
+
+    def test_profile_pictures_are_deduplicated(self):
+        """Verifies that identical pictures are stored once and
+        that the files are deleted when nothing references them.
+        """
+        user_1, user_2, _ = self.users
+        for user in (user_1, user_2):
+            user.is_verified = True
+            user.save()
+        c1, c2 = APIClient(), APIClient()
+        c1.force_authenticate(user=user_1)
+        c2.force_authenticate(user=user_2)
+        update_profile_url = reverse_lazy('users:users-profile')
+        for client in (c1, c2):
+            with create_image(size=(800, 600)) as picture:
+                client.patch(update_profile_url, data={'picture': picture})
+
+        profile_1 = Profile.objects.get(user=user_1)
+        profile_2 = Profile.objects.get(user=user_2)
+        storage = profile_1.picture.storage
+        file_names = [
+            file_name
+            for files in profile_1.picture_renditions.values()
+            for _, file_name in files
+        ]
+
+        self.assertEqual(profile_1.picture.name, profile_2.picture.name)
+        self.assertEqual(
+            profile_1.picture_renditions, profile_2.picture_renditions
+        )
+        self.assertRegex(
+            profile_1.picture.name, r'^users/pictures/[0-9a-f]{64}\.jpeg$'
+        )
+        for file_name in file_names:
+            self.assertEqual(
+                ImageBlob.objects.get(stored_name=file_name).references, 2
+            )
+
+        response = self.client.get(
+            '{}{}'.format(settings.MEDIA_URL, profile_1.picture.name)
+        )
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+
+        with create_image(size=(300, 300)) as picture:
+            c1.patch(update_profile_url, data={'picture': picture})
+        for file_name in file_names:
+            self.assertEqual(
+                ImageBlob.objects.get(stored_name=file_name).references, 1
+            )
+            self.assertTrue(storage.exists(file_name))
+
+        with create_image(size=(300, 300)) as picture:
+            c2.patch(update_profile_url, data={'picture': picture})
+        for file_name in file_names:
+            self.assertFalse(ImageBlob.objects.filter(stored_name=file_name).exists())
+            self.assertFalse(storage.exists(file_name))
+
     def test_list_followers(self):
         """Verifies that all followers of a user
         can be listed.
@@ -1,7 +1,10 @@
 """Utils tests."""
 
+# Django
+from django.conf import settings
+
 # Utils
-from utils.serializers import is_asuka_picture
+from utils.classification import GoogleSearchClassifier
 
 # Tests
 import unittest
@@ -14,8 +17,11 @@ class UtilsTestCase(unittest.TestCase):
         """Verifies that it can make a request
         and identifies the ´Asuka Langley´ pictures.
         """
+        classifier = GoogleSearchClassifier(
+            timeout=settings.ASUKA_CLASSIFIER_TIMEOUT
+        )
         correct_asuka_picture_url = "https://res.cloudinary.com/neuromodmedia/image/upload/v1638719077/test/asuka_example_xwv1i6.jpg"
         wrong_asuka_picture_url = "https://res.cloudinary.com/neuromodmedia/image/upload/v1638719218/test/wrong_asuka_example_g1f3mp.jpg"
 
-        assert is_asuka_picture(image_url=correct_asuka_picture_url) == True
-        assert is_asuka_picture(image_url=wrong_asuka_picture_url) == False
+        assert classifier.classify(image_url=correct_asuka_picture_url) == True
+        assert classifier.classify(image_url=wrong_asuka_picture_url) == False
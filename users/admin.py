@@ -6,7 +6,11 @@ from django.contrib import admin
 # Models
 from users.models import User
 from users.models import Profile
+from users.models import Follow
+from users.models import QueuedEmail
 
 
 admin.site.register(User)
 admin.site.register(Profile)
+admin.site.register(Follow)
+admin.site.register(QueuedEmail)
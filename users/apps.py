@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        """Invalidates the cached responses and users and updates
+        the search index when the models change.
+        """
+        from users.authentication import forget_user
+        from users.models import User, Profile
+        from users.search import index_on_save
+        from utils.caching import invalidate_on_save
+        post_save.connect(invalidate_on_save, sender=User)
+        post_save.connect(invalidate_on_save, sender=Profile)
+        post_save.connect(index_on_save, sender=User)
+        post_save.connect(forget_user, sender=User)
@@ -0,0 +1,227 @@
+"""User authentication.
+
+Access tokens carry the `is_verified` and `is_client` claims of the
+user, see `get_token_claims`. `ClaimsJWTAuthentication` trusts them
+for the lifetime of the token, so authenticating a request doesn't
+query the users table: the request user is a `ClaimsUser` which
+only loads the `User` row when a view needs more than its claims.
+
+Loaded users are kept for `AUTH_USER_CACHE_TTL` seconds in a
+per-process LRU cache, and each request gets its own copy.
+
+Validated access tokens are kept in another per-process LRU cache,
+keyed by the hash of the raw token, until they expire, so the
+requests of a session verify and decode their token once.
+`revoke_token` makes this process reject a token before it expires.
+"""
+
+# Django
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+
+# REST Framework
+from rest_framework.exceptions import AuthenticationFailed
+
+# Simple JWT
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+# Models
+from users.models import User
+
+# Utils
+from collections import OrderedDict
+import copy
+import hashlib
+import threading
+import time
+
+
+CLAIMS = ('is_verified', 'is_client')
+
+
+class ExpiringLRUCache:
+    """Thread-safe LRU cache whose entries expire.
+
+    Entries expire after `ttl` seconds, or at the given timestamp
+    when it's sooner, and the least recently used ones are evicted
+    when there are more than `max_size`.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires=None):
+        """Stores the value until `ttl` seconds pass or
+        the `expires` timestamp, whichever is sooner.
+        """
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if expires is not None:
+            expires_at = min(expires_at, expires)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = ExpiringLRUCache(
+    max_size=settings.AUTH_USER_CACHE_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL,
+)
+
+
+token_cache = ExpiringLRUCache(
+    max_size=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL,
+)
+
+# JTIs of the revoked tokens, kept until the tokens expire.
+revoked_tokens = ExpiringLRUCache(
+    max_size=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=api_settings.ACCESS_TOKEN_LIFETIME.total_seconds(),
+)
+
+
+def get_token_key(raw_token):
+    if isinstance(raw_token, str):
+        raw_token = raw_token.encode('utf-8')
+    return hashlib.sha256(raw_token).digest()
+
+
+def revoke_token(raw_token):
+    """Rejects the given access token in this process from now on."""
+    token_cache.delete(get_token_key(raw_token))
+    token = AccessToken(raw_token, verify=False)
+    revoked_tokens.set(
+        token[api_settings.JTI_CLAIM], True, expires=token['exp']
+    )
+
+
+def forget_user(sender, instance, **kwargs):
+    """`post_save` receiver which drops the cached user."""
+    user_cache.delete(instance.pk)
+
+
+def get_user(pk):
+    """Returns a copy of the active user with the given pk.
+
+    Raises `AuthenticationFailed` when the user doesn't
+    exist or is inactive.
+    """
+    user = user_cache.get(pk)
+    if user is None:
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: pk})
+        except User.DoesNotExist:
+            raise AuthenticationFailed(
+                _('User not found'), code='user_not_found'
+            )
+        user_cache.set(pk, user)
+    if not user.is_active:
+        raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+    return copy.deepcopy(user)
+
+
+def get_token_claims(user):
+    """Returns the claims of the user added to its tokens."""
+    return {claim: getattr(user, claim) for claim in CLAIMS}
+
+
+class ClaimsUser(SimpleLazyObject):
+    """Request user backed by the claims of its access token.
+
+    `pk`, `id`, `is_client` and a true `is_verified` are read from
+    the claims. Any other attribute loads the `User`, and so does a
+    false `is_verified`, as the user may have verified its account
+    after the token was issued.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, pk, claims):
+        super().__init__(lambda: get_user(pk))
+        claims = {
+            claim: value for claim, value in claims.items()
+            if claim != 'is_verified' or value is True
+        }
+        self.__dict__['_claims'] = {'pk': pk, 'id': pk, **claims}
+
+    def __bool__(self):
+        return True
+
+    def __getattr__(self, name):
+        if self._wrapped is empty and name in self._claims:
+            return self._claims[name]
+        return super().__getattr__(name)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication which trusts the claims of the token
+    instead of loading the user.
+
+    Tokens issued without the claims are authenticated with the
+    user row, like `JWTAuthentication` does.
+    """
+
+    token_cache = token_cache
+
+    def get_validated_token(self, raw_token):
+        """Returns the cached validated token, or validates it and
+        caches it until it expires.
+        """
+        if self.token_cache is None:
+            token = super().get_validated_token(raw_token)
+        else:
+            key = get_token_key(raw_token)
+            token = self.token_cache.get(key)
+            if token is None:
+                token = super().get_validated_token(raw_token)
+                self.token_cache.set(key, token, expires=token['exp'])
+        if revoked_tokens.get(token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken(_('Token is revoked'))
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            pk = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+        if not all(claim in validated_token for claim in CLAIMS):
+            return get_user(pk)
+        return ClaimsUser(pk, {
+            claim: validated_token[claim] for claim in CLAIMS
+        })
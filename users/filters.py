@@ -3,9 +3,18 @@
 
 from rest_framework import filters
 
+# Utils
+from users.search import search_users
+
 
 class CustomSearchFilter(filters.SearchFilter):
-    def get_search_fields(self, view, request):
+    """Searches the listed users through the search index,
+    see `users.search`, and the other actions with the
+    `search_fields` of the view.
+    """
+
+    def filter_queryset(self, request, queryset, view):
         if view.action == 'list':
-            return ['username', 'first_name', 'last_name']
-        return super().get_search_fields(view, request)
+            text = request.query_params.get(self.search_param, '')
+            return search_users(queryset, text)
+        return super().filter_queryset(request, queryset, view)
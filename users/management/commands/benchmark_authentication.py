@@ -0,0 +1,89 @@
+"""Benchmark authentication command."""
+
+# Django
+from django.core.management.base import BaseCommand
+
+# REST Framework
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+# Simple JWT
+from rest_framework_simplejwt.tokens import AccessToken
+
+# Models
+from users.models import User
+
+# Utils
+from users.authentication import (
+    ClaimsJWTAuthentication,
+    ExpiringLRUCache,
+    get_token_claims,
+)
+import time
+
+
+class Command(BaseCommand):
+    """Shows how many requests per second are authenticated with
+    and without the cache of validated tokens.
+
+    Each session sends `--requests` requests with the same token,
+    like a client does during the lifetime of its access token.
+    The users aren't loaded, so no database is needed.
+    """
+
+    help = (
+        'Shows the requests per second authenticated with and without '
+        'the validated tokens cache.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sessions',
+            type=int,
+            default=100,
+            help='Quantity of distinct tokens.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Requests sent with each token.'
+        )
+
+    def get_requests(self, sessions, requests):
+        factory = APIRequestFactory()
+        headers = []
+        for pk in range(1, sessions + 1):
+            user = User(pk=pk, is_verified=True, is_client=True)
+            token = AccessToken.for_user(user)
+            for claim, value in get_token_claims(user).items():
+                token[claim] = value
+            headers.append(f'Bearer {token}')
+        return [
+            Request(factory.get('/', HTTP_AUTHORIZATION=header))
+            for _ in range(requests)
+            for header in headers
+        ]
+
+    def run(self, label, authentication, requests):
+        start = time.perf_counter()
+        for request in requests:
+            authentication.authenticate(request)
+        elapsed = time.perf_counter() - start
+        rate = len(requests) / elapsed
+        self.stdout.write(f'{label}: {rate:,.0f} requests/s')
+        return rate
+
+    def handle(self, *args, **options):
+        requests = self.get_requests(options['sessions'], options['requests'])
+
+        uncached = ClaimsJWTAuthentication()
+        uncached.token_cache = None
+        cached = ClaimsJWTAuthentication()
+        cached.token_cache = ExpiringLRUCache(
+            max_size=options['sessions'], ttl=300
+        )
+
+        without_cache = self.run('Without cache', uncached, requests)
+        with_cache = self.run('With cache', cached, requests)
+        self.stdout.write(f'Speedup: {with_cache / without_cache:.1f}x')
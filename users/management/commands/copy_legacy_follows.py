@@ -0,0 +1,92 @@
+"""Copy legacy follows command."""
+
+# Django
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+# Models
+from users.models import Follow, Profile
+
+# Utils
+from utils.counters import get_counters, reconcile_counter
+
+
+# Many to many tables of the former `Profile.following` and
+# `Profile.followers` fields, with the follower and followed columns.
+LEGACY_TABLES = {
+    # The user of the profile follows the user.
+    'users_profile_following': ('profile.user_id', 'legacy.user_id'),
+    # The user follows the user of the profile.
+    'users_profile_followers': ('legacy.user_id', 'profile.user_id'),
+}
+
+
+class Command(BaseCommand):
+    """Copies the follows stored by the former `Profile.followers`
+    and `Profile.following` many to many tables into `Follow`.
+
+    Tables which don't exist are skipped and the edges already
+    copied are ignored, so it can be run more than once. The follow
+    counters are reconciled afterwards. It must be run after
+    deploying `Follow` and before the legacy tables are dropped.
+    """
+
+    help = 'Copies the follows of the legacy profile tables into Follow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantity of follows inserted per statement.'
+        )
+
+    def handle(self, *args, **options):
+        tables = set(connection.introspection.table_names())
+        for table, (follower, followed) in LEGACY_TABLES.items():
+            if table not in tables:
+                self.stdout.write(f'{table}: not found, skipped.')
+                continue
+            copied = self.copy_table(
+                table, follower, followed, options['batch_size']
+            )
+            self.stdout.write(f'{table}: copied {copied} follows.')
+
+        counters = get_counters()
+        for name in (
+            'profile.followers_quantity', 'profile.following_quantity'
+        ):
+            drift = reconcile_counter(
+                counters[name], batch_size=options['batch_size']
+            )
+            self.stdout.write(f'{name}: fixed {drift.drifted} profiles.')
+
+    def copy_table(self, table, follower, followed, batch_size):
+        """Inserts the edges of the given legacy table which
+        aren't stored yet and returns how many were inserted.
+        """
+        quote = connection.ops.quote_name
+        sql = (
+            f'SELECT legacy.id, {follower}, {followed} '
+            f'FROM {quote(table)} legacy '
+            f'INNER JOIN {quote(Profile._meta.db_table)} profile '
+            'ON profile.id = legacy.profile_id '
+            'WHERE legacy.id > %s ORDER BY legacy.id LIMIT %s'
+        )
+        before = Follow.objects.count()
+        last_pk = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [last_pk, batch_size])
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            Follow.objects.bulk_create(
+                [
+                    Follow(follower_id=follower_pk, followed_id=followed_pk)
+                    for _, follower_pk, followed_pk in rows
+                ],
+                ignore_conflicts=True
+            )
+        return Follow.objects.count() - before
@@ -0,0 +1,36 @@
+"""Rebuild search index command."""
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Models
+from users.models import User
+
+# Utils
+from users.search import rebuild_index
+from utils import caching
+
+
+class Command(BaseCommand):
+    """Rebuilds the search tokens of every user.
+
+    The tokens are updated when a user is saved, so it's only needed
+    for users created before the index, or changed with `update()`.
+    """
+
+    help = 'Rebuilds the search tokens of every user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantity of users indexed per batch.'
+        )
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(
+            User.objects.all(), batch_size=options['batch_size']
+        )
+        caching.invalidate(caching.USERS_SCOPE)
+        self.stdout.write(f'Indexed {indexed} users.')
@@ -0,0 +1,50 @@
+"""Send queued emails command."""
+
+# Django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Utils
+from utils.mail import send_queued_emails
+import time
+
+
+class Command(BaseCommand):
+    """Sends the queued emails which are due.
+
+    Runs once, or every `--interval` seconds when it is given, so
+    it can be used as a cron job or as a background worker. Several
+    instances can run at a time, each one claims its own batches.
+    """
+
+    help = 'Sends the queued emails which are due.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Keep running and send the due emails every given seconds.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Quantity of emails sent through each connection.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or settings.EMAIL_QUEUE_BATCH_SIZE
+        while True:
+            delivery = send_queued_emails(batch_size)
+            if any(delivery):
+                self.stdout.write(
+                    f'Sent {delivery.sent} emails, {delivery.retried} '
+                    f'will be retried and {delivery.failed} failed.'
+                )
+            # A full batch is followed by the next one right away.
+            if sum(delivery) == batch_size:
+                continue
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -1,2 +1,5 @@
 from .user import User
-from .profile import Profile
\ No newline at end of file
+from .profile import Profile
+from .follows import Follow
+from .search import UserSearchToken
+from .emails import QueuedEmail
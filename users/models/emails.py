@@ -0,0 +1,60 @@
+"""Queued email model."""
+
+# Django
+from django.db import models
+
+# Utils
+from utils.models import AskalleryModel, EmailStatus
+
+
+class QueuedEmail(AskalleryModel):
+    """Queued email model.
+
+    An outbound email waiting to be sent by the mail worker,
+    see `utils.mail`.
+    """
+
+    subject = models.CharField('subject', max_length=255)
+
+    body = models.TextField('text body')
+
+    html_body = models.TextField('HTML body', blank=True)
+
+    from_email = models.CharField('from', max_length=255)
+
+    to = models.JSONField('recipients', default=list)
+
+    status = models.CharField(
+        'status',
+        max_length=10,
+        choices=EmailStatus.choices,
+        default=EmailStatus.PENDING
+    )
+
+    attempts = models.PositiveSmallIntegerField(
+        'attempts',
+        default=0,
+        help_text='Quantity of failed delivery attempts.'
+    )
+
+    next_attempt = models.DateTimeField(
+        'next attempt',
+        help_text='The email is not sent before this datetime.'
+    )
+
+    last_error = models.TextField('last error', blank=True)
+
+    class Meta(AskalleryModel.Meta):
+        """Meta options."""
+
+        indexes = [
+            # Lookup of the emails which are due.
+            models.Index(
+                fields=['status', 'next_attempt'],
+                name='queued_email_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        """Returns the subject and the recipients."""
+        return '{} -> {}'.format(self.subject, ', '.join(self.to))
@@ -0,0 +1,45 @@
+"""Follow model."""
+
+# Django
+from django.db import models
+
+
+class Follow(models.Model):
+    """Follow model.
+
+    A Follow is the directed edge of the follow graph, from the
+    follower to the followed user. Each relationship is stored
+    once, the followers and the following users of a user are
+    both derived from this table.
+    """
+
+    follower = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='following_edges'
+    )
+
+    followed = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='follower_edges'
+    )
+
+    created = models.DateTimeField(
+        'created at',
+        auto_now_add=True,
+        help_text='Stores the datetime when the user was followed.'
+    )
+
+    class Meta:
+        """Meta options."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['follower', 'followed'], name='unique_follow'
+            ),
+        ]
+
+    def __str__(self):
+        """Returns the follower and the followed user pks."""
+        return f'{self.follower_id} -> {self.followed_id}'
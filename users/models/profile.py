@@ -5,10 +5,16 @@ from rest_framework.serializers import ValidationError as SerializerValidationEr
 
 # Django
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Models
+from users.models.follows import Follow
 
 # Utils
-from utils.models import AskalleryModel
+from utils import caching
+from utils.models import AskalleryModel, ImageStatus
 
 
 class Profile(AskalleryModel, models.Model):
@@ -28,6 +34,21 @@ class Profile(AskalleryModel, models.Model):
         help_text='User profile picture.'
     )
 
+    picture_status = models.CharField(
+        'picture status',
+        max_length=10,
+        choices=ImageStatus.choices,
+        default=ImageStatus.READY,
+        help_text='It will be ready when the picture has been compressed.'
+    )
+
+    picture_renditions = models.JSONField(
+        'picture renditions',
+        default=dict,
+        blank=True,
+        help_text='Stored file name of each size of the picture.'
+    )
+
     biography = models.TextField(
         'biography',
         null=True,
@@ -36,10 +57,6 @@ class Profile(AskalleryModel, models.Model):
         help_text='User profile biography.'
     )
 
-    followers = models.ManyToManyField('users.User', related_name='followers')
-
-    following = models.ManyToManyField('users.User', related_name='following')
-
     followers_quantity = models.IntegerField(
         'quantity of followers',
         default=0,
@@ -60,33 +77,72 @@ class Profile(AskalleryModel, models.Model):
         )
     )
 
+    def get_cache_scopes(self):
+        """Returns the response cache scopes of this profile."""
+        return [caching.user_scope(self.user_id), caching.USERS_SCOPE]
+
+    @property
+    def followers(self):
+        """Returns the users who follow this user."""
+        return self.user.followers
+
+    @property
+    def following(self):
+        """Returns the users followed by this user."""
+        return self.user.following
+
     def start_follow(self, followed_user):
         """Establishes a relationship between this user and passed user,
-        also updates their 'following', 'followers',
-        following_quantity and 'followers_quantity 'attributes.
-        """
-        if not self.following.filter(pk=followed_user.pk).exists():
-            self.following.add(followed_user)
-            self.following_quantity += 1
-            self.save()
+        also updates their 'following_quantity' and 'followers_quantity'.
 
-            followed_user.profile.followers.add(self.user)
-            followed_user.profile.followers_quantity += 1
-            followed_user.save()
+        Returns whether the relationship was created.
+        """
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    Follow.objects.create(
+                        follower=self.user, followed=followed_user
+                    )
+            except IntegrityError:
+                return False
+            self._update_follow_counters(followed_user, 1)
+        return True
 
     def stop_following(self, followed_user):
         """Removes a relationship between this user and passed user,
-        also updates their 'following', 'followers',
-        following_quantity and 'followers_quantity 'attributes.
+        also updates their 'following_quantity' and 'followers_quantity'.
+
+        Returns whether the relationship was removed.
         """
-        if self.following.filter(pk=followed_user.pk).exists():
-            self.following.remove(followed_user)
-            self.following_quantity -= 1
-            self.save()
-
-            followed_user.profile.followers.remove(self.user)
-            followed_user.profile.followers_quantity -= 1
-            followed_user.save()
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(
+                follower=self.user, followed=followed_user
+            ).delete()
+            if not deleted:
+                return False
+            self._update_follow_counters(followed_user, -1)
+        return True
+
+    def _update_follow_counters(self, followed_user, delta):
+        """Updates both counters with F() expressions, and the
+        loaded profiles without querying them.
+        """
+        Profile.objects.filter(pk=self.pk).update(
+            following_quantity=F('following_quantity') + delta,
+            modified=timezone.now()
+        )
+        Profile.objects.filter(user=followed_user).update(
+            followers_quantity=F('followers_quantity') + delta,
+            modified=timezone.now()
+        )
+        caching.invalidate(
+            caching.user_scope(self.user_id),
+            caching.user_scope(followed_user.pk),
+            caching.USERS_SCOPE
+        )
+        self.following_quantity += delta
+        if type(followed_user).profile.related.is_cached(followed_user):
+            followed_user.profile.followers_quantity += delta
 
     def __str__(self):
         """Retuens username."""
@@ -0,0 +1,45 @@
+"""User search token model."""
+
+# Django
+from django.db import models
+
+
+class UserSearchToken(models.Model):
+    """User search token model.
+
+    The search index of the users: each row is a token taken from
+    the username, first name or last name of a user, see
+    `users.search`. Tokens are looked up by equality, so searching
+    uses the index instead of scanning the users table.
+    """
+
+    user = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+
+    token = models.CharField(max_length=32)
+
+    weight = models.PositiveSmallIntegerField(
+        help_text='Relevance of the token when ranking the results.'
+    )
+
+    class Meta:
+        """Meta options."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'token'], name='unique_user_search_token'
+            ),
+        ]
+        indexes = [
+            # Lookup of the users which have a token.
+            models.Index(
+                fields=['token', 'user'], name='user_search_token_idx'
+            ),
+        ]
+
+    def __str__(self):
+        """Returns the user pk and the token."""
+        return f'{self.user_id}: {self.token}'
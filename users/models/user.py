@@ -5,6 +5,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 
 # Utils
+from utils import caching
 from utils.models import AskalleryModel
 
 
@@ -41,10 +42,34 @@ class User(AskalleryModel, AbstractUser):
         help_text='Set to True when the user has verified their email address.'
     )
 
+    following = models.ManyToManyField(
+        'self',
+        symmetrical=False,
+        through='users.Follow',
+        through_fields=('follower', 'followed'),
+        related_name='followers',
+        help_text='Users followed by this user.'
+    )
+
+    class Meta(AskalleryModel.Meta):
+        """Meta options."""
+
+        indexes = [
+            # Listing of the verified clients in the default ordering.
+            models.Index(
+                fields=['is_client', 'is_verified', '-created', '-modified'],
+                name='user_client_verified_idx'
+            ),
+        ]
+
     def __str__(self):
         """Returns username."""
         return self.username
 
+    def get_cache_scopes(self):
+        """Returns the response cache scopes of this user."""
+        return [caching.user_scope(self.pk), caching.USERS_SCOPE]
+
     def get_short_name(self):
         """Returns username."""
         return self.username
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""User search.
+
+Users are searched through `UserSearchToken` rows instead of
+`LIKE '%term%'` scans. Each word of the username, first name and
+last name is indexed as:
+
++ Its prefixes, e.g. `^ann` for `anna`, which match the words the
+  term starts, as the search box is typed.
+
++ Its trigrams, e.g. `nna`, which match the words containing the
+  term anywhere.
+
+A word of the search term matches a user when its prefix token or
+all its trigrams are indexed for the user, and every word must
+match. The results are ranked by the weights of the matched tokens:
+prefixes weigh more than trigrams and the username more than the
+names.
+
+Words shorter than `MIN_WORD_LENGTH` are ignored, and only the
+`MAX_CANDIDATES` users ranked best by the first word are matched
+against the others, so short and common words don't rank every user.
+
+The tokens are updated when a user is saved, and can be rebuilt
+with the `rebuild_search_index` command.
+"""
+
+# Django
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+# Models
+from users.models import UserSearchToken
+
+# Utils
+import re
+import unicodedata
+
+
+SEARCH_FIELDS = {'username': 3, 'first_name': 2, 'last_name': 2}
+PREFIX_MARK = '^'
+PREFIX_LENGTH = 16
+MAX_QUERY_WORDS = 4
+MIN_WORD_LENGTH = 2
+MAX_CANDIDATES = 200
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def get_words(text):
+    """Returns the lowercase words of the text without accents."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return WORD_RE.findall(text.casefold())
+
+
+def get_trigrams(word):
+    """Returns the distinct trigrams of the word."""
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def get_prefix(word):
+    return PREFIX_MARK + word[:PREFIX_LENGTH]
+
+
+def get_user_tokens(user):
+    """Returns the weights of the search tokens of the user."""
+    tokens = {}
+
+    def add(token, weight):
+        tokens[token] = max(tokens.get(token, 0), weight)
+
+    for field, weight in SEARCH_FIELDS.items():
+        for word in get_words(getattr(user, field)):
+            for i in range(1, min(len(word), PREFIX_LENGTH) + 1):
+                add(PREFIX_MARK + word[:i], weight * 2)
+            for trigram in get_trigrams(word):
+                add(trigram, weight)
+    return tokens
+
+
+def index_user(user):
+    """Updates the search tokens of the user when they changed."""
+    tokens = get_user_tokens(user)
+    indexed = dict(
+        UserSearchToken.objects.filter(user=user).values_list(
+            'token', 'weight'
+        )
+    )
+    if indexed == tokens:
+        return
+    with transaction.atomic():
+        UserSearchToken.objects.filter(user=user).delete()
+        UserSearchToken.objects.bulk_create([
+            UserSearchToken(user=user, token=token, weight=weight)
+            for token, weight in tokens.items()
+        ])
+
+
+def index_on_save(sender, instance, update_fields=None, **kwargs):
+    """`post_save` receiver which indexes the saved user."""
+    if update_fields is not None and not set(update_fields) & set(
+        SEARCH_FIELDS
+    ):
+        return
+    index_user(instance)
+
+
+def rebuild_index(users, batch_size=1000):
+    """Rebuilds the search tokens of the given users queryset.
+
+    Returns the quantity of indexed users.
+    """
+    indexed = 0
+    users = users.order_by('pk').only('pk', *SEARCH_FIELDS)
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return indexed
+        last_pk = batch[-1].pk
+        with transaction.atomic():
+            UserSearchToken.objects.filter(user__in=batch).delete()
+            UserSearchToken.objects.bulk_create(
+                [
+                    UserSearchToken(user=user, token=token, weight=weight)
+                    for user in batch
+                    for token, weight in get_user_tokens(user).items()
+                ],
+                batch_size=batch_size
+            )
+        indexed += len(batch)
+
+
+def search_users(queryset, text):
+    """Filters the users queryset by the search text and
+    orders it by relevance.
+    """
+    words = get_words(text)
+    if not words:
+        return queryset
+    words = [
+        word for word in words if len(word) >= MIN_WORD_LENGTH
+    ][:MAX_QUERY_WORDS]
+    if not words:
+        return queryset.none()
+
+    # Only the users ranked best by the first word are candidates.
+    first_tokens = [get_prefix(words[0]), *get_trigrams(words[0])]
+    candidates = list(
+        UserSearchToken.objects.filter(token__in=first_tokens)
+        .values('user')
+        .annotate(score=Sum('weight'))
+        .order_by('-score')
+        .values_list('user', flat=True)[:MAX_CANDIDATES]
+    )
+    queryset = queryset.filter(pk__in=candidates)
+
+    user_tokens = UserSearchToken.objects.filter(
+        user=OuterRef('pk')
+    ).order_by().values('user')
+    rank = None
+    for i, word in enumerate(words):
+        prefix, trigrams = get_prefix(word), get_trigrams(word)
+        word_tokens = user_tokens.filter(token__in=[prefix, *trigrams])
+        score = Coalesce(
+            Subquery(
+                word_tokens.annotate(score=Sum('weight')).values('score')
+            ),
+            0
+        )
+        rank = score if rank is None else rank + score
+
+        condition = Q(**{f'_search_prefix_{i}': True})
+        annotations = {
+            f'_search_prefix_{i}': Exists(user_tokens.filter(token=prefix))
+        }
+        if trigrams:
+            annotations[f'_search_trigrams_{i}'] = Coalesce(
+                Subquery(
+                    user_tokens.filter(token__in=trigrams)
+                    .annotate(matched=Count('pk')).values('matched')
+                ),
+                0
+            )
+            condition |= Q(**{f'_search_trigrams_{i}__gte': len(trigrams)})
+        queryset = queryset.annotate(**annotations).filter(condition)
+
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return queryset.annotate(search_rank=rank).order_by(
+        '-search_rank', *ordering
+    )
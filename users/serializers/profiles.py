@@ -8,7 +8,9 @@ from rest_framework.generics import get_object_or_404
 from users.models import Profile, User
 
 # Utils
-from utils.serializers import size_reduction
+from posts.timelines import invalidate_timeline
+from utils.images import PROFILE_PICTURE_RENDITIONS, process_image
+from utils.models import ImageStatus
 
 
 class ProfileModelSerializer(serializers.ModelSerializer):
@@ -18,11 +20,13 @@ class ProfileModelSerializer(serializers.ModelSerializer):
         model = Profile
         fields = (
             'picture',
+            'picture_status',
             'biography',
             'followers_quantity',
             'following_quantity',
         )
         read_only_fields = (
+            'picture_status',
             'following_quantity',
             'followers_quantity',
         )
@@ -37,13 +41,15 @@ class ProfileModelSerializer(serializers.ModelSerializer):
         return value
 
     def update(self, instance, data):
-        """Compress and resize `picture`."""
-        if 'picture' in data:
-            data['picture'] = size_reduction(
-                data['picture'], quality=60,
-                width=600, height=600
-            )
-        return super(ProfileModelSerializer, self).update(instance, data)
+        """Stores the profile and schedules the
+        compression and resizing of `picture`.
+        """
+        if data.get('picture'):
+            data['picture_status'] = ImageStatus.PROCESSING
+        profile = super(ProfileModelSerializer, self).update(instance, data)
+        if data.get('picture'):
+            process_image(profile, 'picture', PROFILE_PICTURE_RENDITIONS)
+        return profile
 
 
 class ProfileFollowSerializer(serializers.Serializer):
@@ -86,5 +92,6 @@ class ProfileFollowSerializer(serializers.Serializer):
             request_user.profile.start_follow(followed_user)
         else:
             request_user.profile.stop_following(followed_user)
+        invalidate_timeline(request_user)
 
         return followed_user
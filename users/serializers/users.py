@@ -6,8 +6,17 @@ from django.conf import settings
 
 # REST Framework
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.validators import UniqueValidator
 
+# Simple JWT
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
 # Serializers
 from users.serializers import ProfileModelSerializer
 
@@ -15,7 +24,8 @@ from users.serializers import ProfileModelSerializer
 from users.models import User, Profile
 
 # Utils
-from utils.serializers import send_confirmation_email
+from users.authentication import get_token_claims
+from utils.serializers import get_rendition_urls, send_confirmation_email
 import jwt
 
 
@@ -44,11 +54,12 @@ class MinimumUserFieldsModelSerializer(serializers.ModelSerializer):
         fields = ('pk', 'first_name', 'last_name', 'username', 'picture')
 
     def get_picture(self, instance):
-        """Returns user's profile picture."""
-        if instance.profile.picture:
-            request = self.context.get("request")
-            return request.build_absolute_uri(instance.profile.picture.url)
-        return None
+        """Returns the URL of each size of the user's profile picture."""
+        return get_rendition_urls(
+            self.context.get("request"),
+            instance.profile.picture,
+            instance.profile.picture_renditions
+        )
 
 
 class UserSignUpModelSerializer(serializers.ModelSerializer):
@@ -134,3 +145,38 @@ class AccountVerificationSerializer(serializers.Serializer):
         user = User.objects.get(username=payload['user'])
         user.is_verified = True
         user.save()
+
+
+class TokenObtainPairWithClaimsSerializer(TokenObtainPairSerializer):
+    """Token pair serializer which adds the claims trusted
+    by `ClaimsJWTAuthentication` to the tokens.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in get_token_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class TokenRefreshWithClaimsSerializer(TokenRefreshSerializer):
+    """Token refresh serializer which reloads the user, so the
+    new access token carries its current claims and inactive
+    users can't refresh their tokens.
+    """
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        user = User.objects.filter(**{
+            api_settings.USER_ID_FIELD: refresh.get(
+                api_settings.USER_ID_CLAIM
+            )
+        }).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(
+                'User not found or inactive.', code='user_inactive'
+            )
+        for claim, value in get_token_claims(user).items():
+            refresh[claim] = value
+        return super().validate({'refresh': str(refresh)})
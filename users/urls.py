@@ -6,6 +6,9 @@ from django.urls import include, path
 # REST Framework
 from rest_framework.routers import SimpleRouter
 
+# Serializers
+from users import serializers as user_serializers
+
 # Views
 from users import views as user_views
 
@@ -23,12 +26,20 @@ urlpatterns = [
     # Simple JWT
     path(
         'token/',
-        token_views.TokenObtainPairView.as_view(),
+        token_views.TokenObtainPairView.as_view(
+            serializer_class=(
+                user_serializers.TokenObtainPairWithClaimsSerializer
+            )
+        ),
         name='token_obtain_pair'
     ),
     path(
         'token/refresh/',
-        token_views.TokenRefreshView.as_view(),
+        token_views.TokenRefreshView.as_view(
+            serializer_class=(
+                user_serializers.TokenRefreshWithClaimsSerializer
+            )
+        ),
         name='token_refresh'
     ),
 
@@ -5,6 +5,7 @@ from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.generics import get_object_or_404
+from rest_framework.settings import api_settings
 
 # Filters
 from users.filters import CustomSearchFilter
@@ -31,6 +32,12 @@ from posts.serializers import PostModelSerializer
 from users.models import User
 from posts.models import Post
 
+# Utils
+from utils import caching
+from utils.caching import cache_anonymous_response
+from utils.conditional import conditional_on_modified
+from utils.pagination import UncountedLimitOffsetPagination
+
 
 class UserViewSet(
     mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet
@@ -39,6 +46,13 @@ class UserViewSet(
 
     filter_backends = [CustomSearchFilter]
 
+    @property
+    def pagination_class(self):
+        """The users list, which is searched, isn't counted."""
+        if self.action == 'list':
+            return UncountedLimitOffsetPagination
+        return api_settings.DEFAULT_PAGINATION_CLASS
+
     def get_permissions(self):
         """Assign permissions based on action."""
         permissions = [IsAuthenticated, HasAccountVerified]
@@ -50,7 +64,9 @@ class UserViewSet(
 
     def get_queryset(self):
         """Assigns queryset based on action."""
-        queryset = User.objects.filter(is_client=True, is_verified=True)
+        queryset = User.objects.filter(
+            is_client=True, is_verified=True
+        ).select_related('profile')
         if self.action == 'followers':
             user = get_object_or_404(
                 User,
@@ -58,7 +74,7 @@ class UserViewSet(
                 is_client=True,
                 is_verified=True
             )
-            queryset = user.profile.followers.all()
+            queryset = user.followers.select_related('profile')
         elif self.action == 'following':
             user = get_object_or_404(
                 User,
@@ -66,10 +82,14 @@ class UserViewSet(
                 is_client=True,
                 is_verified=True
             )
-            queryset = user.profile.following.all()
+            queryset = user.following.select_related('profile')
         elif self.action == 'posts':
             user = get_object_or_404(User, pk=self.kwargs.get('pk'))
-            queryset = Post.objects.filter(user=user, is_active=True)
+            queryset = Post.objects.filter(
+                user=user, is_active=True
+            ).select_related('user__profile').annotate_liked_by(
+                self.request.user
+            )
         return queryset
 
     def get_serializer_class(self):
@@ -97,6 +117,24 @@ class UserViewSet(
             renderers.append(TemplateHTMLRenderer)
         return [r() for r in renderers]
 
+    @cache_anonymous_response(
+        lambda view, request: [caching.USERS_SCOPE]
+    )
+    @conditional_on_modified('modified', 'profile__modified')
+    def list(self, request, *args, **kwargs):
+        """Lists the verified users, or the users of
+        the actions which call it.
+        """
+        return super(UserViewSet, self).list(request, *args, **kwargs)
+
+    @cache_anonymous_response(
+        lambda view, request, pk: [caching.user_scope(pk)]
+    )
+    @conditional_on_modified('modified', 'profile__modified', detail=True)
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieves a verified user."""
+        return super(UserViewSet, self).retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=['POST'])
     def signup(self, request):
         """User sign up."""
@@ -163,6 +201,12 @@ class UserViewSet(
         return self.list(request, *args, **kwargs)
 
     @action(detail=True, methods=['GET'])
+    @cache_anonymous_response(lambda view, request, pk: [
+        caching.user_posts_scope(pk), caching.user_scope(pk)
+    ])
+    @conditional_on_modified(
+        'modified', 'user__modified', 'user__profile__modified'
+    )
     def posts(self, request, *args, **kwargs):
         """List all post of the request user."""
-        return self.list(request, *args, **kwargs)
+        return super(UserViewSet, self).list(request, *args, **kwargs)
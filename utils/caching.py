@@ -0,0 +1,228 @@
+"""Response caching for anonymous requests.
+
+The serialized data of public endpoints is cached in the
+`RESPONSE_CACHE_ALIAS` cache under keys built from the versions of
+the scopes the response depends on, e.g. `post:<pk>`. Changing an
+object bumps the versions of its scopes, so the outdated entries
+are never read again and expire on their own.
+
+Hits and misses are counted in the same cache, see `get_metrics`.
+
+The versions must be seen by every process, so responses are only
+cached when the cache is shared by them, see `is_shared_cache`.
+"""
+
+# Django
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import connection, transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+# REST Framework
+from rest_framework.response import Response
+
+# Utils
+from functools import wraps
+import hashlib
+import json
+import time
+
+
+KEY_PREFIX = 'response'
+USERS_SCOPE = 'users'
+HITS_KEY = '{}:hits'.format(KEY_PREFIX)
+MISSES_KEY = '{}:misses'.format(KEY_PREFIX)
+
+
+def is_shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    """Returns whether the entries of the given cache are seen by
+    every process and its counters are atomic, i.e. whether its
+    backend is one of the `SHARED_CACHE_BACKENDS`.
+    """
+    backend = type(caches[alias])
+    path = '{}.{}'.format(backend.__module__, backend.__qualname__)
+    return path in settings.SHARED_CACHE_BACKENDS
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def is_enabled():
+    """Returns whether the responses are cached."""
+    return (
+        settings.RESPONSE_CACHE_TIMEOUT > 0
+        and is_shared_cache(settings.RESPONSE_CACHE_ALIAS)
+    )
+
+
+def post_scope(pk):
+    """Returns the scope of a post."""
+    return f'post:{pk}'
+
+
+def user_scope(pk):
+    """Returns the scope of a user and its profile."""
+    return f'user:{pk}'
+
+
+def user_posts_scope(user_pk):
+    """Returns the scope of the posts of a user."""
+    return f'user_posts:{user_pk}'
+
+
+def _version_key(scope):
+    return '{}:version:{}'.format(KEY_PREFIX, scope)
+
+
+def _bump(scopes):
+    cache = get_cache()
+    for scope in scopes:
+        key = _version_key(scope)
+        # A version which was evicted restarts from the current
+        # time, so it can't match the keys of older entries.
+        if not cache.add(key, int(time.time() * 1000), timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def invalidate(*scopes):
+    """Bumps the versions of the given scopes.
+
+    Inside a transaction they are bumped again once it's committed,
+    so a request reading the old rows meanwhile can't cache them
+    under the new versions.
+    """
+    if not is_enabled():
+        return
+    _bump(scopes)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def invalidate_instance(instance):
+    """Bumps the versions of the scopes returned by
+    the `get_cache_scopes` method of the instance.
+    """
+    invalidate(*instance.get_cache_scopes())
+
+
+def invalidate_on_save(sender, instance, **kwargs):
+    """`post_save` receiver which invalidates the saved instance."""
+    invalidate_instance(instance)
+
+
+def _get_versions(scopes):
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {
+        key: int(time.time() * 1000) for key in keys if key not in versions
+    }
+    for key, version in missing.items():
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+        versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def _count(key):
+    cache = get_cache()
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+
+def get_metrics():
+    """Returns the quantity of cache hits and misses."""
+    values = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': values.get(HITS_KEY, 0),
+        'misses': values.get(MISSES_KEY, 0),
+    }
+
+
+def _build_key(request, view_name, scopes):
+    # The image URLs are negotiated with the Accept header.
+    raw = '|'.join([
+        view_name,
+        ','.join(str(v) for v in _get_versions(scopes)),
+        request.get_host(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return '{}:{}'.format(
+        KEY_PREFIX, hashlib.md5(raw.encode('utf-8')).hexdigest()
+    )
+
+
+def _set_headers(response, etag=None):
+    patch_vary_headers(response, ('Accept', 'Authorization'))
+    if etag is None:
+        patch_cache_control(response, private=True)
+        return response
+    response['ETag'] = etag
+    patch_cache_control(
+        response, public=True, max_age=settings.RESPONSE_CACHE_MAX_AGE
+    )
+    return response
+
+
+def cache_anonymous_response(get_scopes):
+    """Caches the data of the decorated view set action for
+    anonymous GET requests.
+
+    `get_scopes` receives the view, the request and the URL kwargs,
+    and returns the scopes the response depends on.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if (
+                not is_enabled()
+                or request.method != 'GET'
+                or request.user.is_authenticated
+            ):
+                return _set_headers(
+                    view_method(self, request, *args, **kwargs)
+                )
+
+            cache = get_cache()
+            key = _build_key(
+                request,
+                '{}.{}'.format(self.basename, self.action),
+                get_scopes(self, request, **kwargs)
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                _count(HITS_KEY)
+                data, etag = cached
+                if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+                    response = Response(status=304)
+                else:
+                    response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return _set_headers(response, etag)
+
+            _count(MISSES_KEY)
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 304:
+                return _set_headers(response, response['ETag'])
+            if response.status_code != 200:
+                return _set_headers(response)
+            # The view may have set its own validator.
+            etag = response.get('ETag') or '"{}"'.format(hashlib.md5(
+                json.dumps(response.data, sort_keys=True, default=str)
+                .encode('utf-8')
+            ).hexdigest())
+            cache.set(
+                key, (response.data, etag), settings.RESPONSE_CACHE_TIMEOUT
+            )
+            response['X-Cache'] = 'MISS'
+            return _set_headers(response, etag)
+        return wrapper
+    return decorator
@@ -0,0 +1,303 @@
+"""Picture classification utilities.
+
+The classifier backend is set in `ASUKA_CLASSIFIER` and every
+classification must finish within `ASUKA_CLASSIFIER_TIMEOUT`
+seconds, otherwise `ClassificationError` is raised.
+
+Classifying a picture is slow, so the verdicts are cached by the
+perceptual hashes of the picture. Re-uploads and near-duplicates
+(pictures whose hashes differ in a few bits) reuse the verdict.
+"""
+
+# Django
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Utils
+from bs4 import BeautifulSoup
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from PIL import Image
+from requests.adapters import HTTPAdapter
+import colorsys
+import requests
+import threading
+import time
+
+
+HASH_SIZE = 8
+
+PerceptualHash = namedtuple('PerceptualHash', ('ahash', 'dhash'))
+
+
+def average_hash(img):
+    """Returns the aHash of the given Pillow image as an integer.
+
+    Each bit tells whether a pixel of the downscaled grayscale
+    image is brighter than the mean.
+    """
+    pixels = list(
+        img.convert('L').resize((HASH_SIZE, HASH_SIZE), Image.BILINEAR)
+        .getdata()
+    )
+    mean = sum(pixels) / len(pixels)
+    value = 0
+    for pixel in pixels:
+        value = (value << 1) | (pixel > mean)
+    return value
+
+
+def difference_hash(img):
+    """Returns the dHash of the given Pillow image as an integer.
+
+    Each bit tells whether a pixel of the downscaled grayscale
+    image is brighter than its right neighbour.
+    """
+    pixels = list(
+        img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+        .getdata()
+    )
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def perceptual_hash(image):
+    """Returns the aHash and dHash of the given image file."""
+    position = image.tell()
+    with Image.open(image) as img:
+        img.draft('L', (HASH_SIZE * 4, HASH_SIZE * 4))
+        result = PerceptualHash(average_hash(img), difference_hash(img))
+    image.seek(position)
+    return result
+
+
+def hamming_distance(a, b):
+    """Returns the quantity of different bits between two hashes."""
+    return bin(a ^ b).count('1')
+
+
+class VerdictCache:
+    """Thread-safe LRU cache of verdicts keyed by perceptual hash.
+
+    Entries expire after `ttl` seconds and the least recently used
+    ones are evicted when there are more than `max_size`. A lookup
+    hits when both hashes are within `max_distance` bits of a
+    cached entry.
+    """
+
+    def __init__(self, max_size, ttl, max_distance):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached verdict for the given hash or None."""
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                match = key
+            else:
+                match = None
+                for candidate in self._entries:
+                    if (
+                        hamming_distance(candidate.ahash, key.ahash)
+                        <= self.max_distance
+                        and hamming_distance(candidate.dhash, key.dhash)
+                        <= self.max_distance
+                    ):
+                        match = candidate
+                        break
+            if match is None:
+                return None
+            verdict, expires = self._entries[match]
+            if expires <= now:
+                del self._entries[match]
+                return None
+            self._entries.move_to_end(match)
+            return verdict
+
+    def set(self, key, verdict):
+        """Stores the verdict for the given hash."""
+        with self._lock:
+            self._entries[key] = (verdict, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verdict_cache = VerdictCache(
+    max_size=settings.ASUKA_VERDICT_CACHE_SIZE,
+    ttl=settings.ASUKA_VERDICT_CACHE_TTL,
+    max_distance=settings.ASUKA_VERDICT_MAX_DISTANCE,
+)
+
+
+# Pooled HTTP connections shared by the lookups of every thread.
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
+
+class ClassificationError(Exception):
+    """The classifier couldn't give a verdict in time."""
+
+
+class BaseClassifier:
+    """Classifier backend interface."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def classify(self, image):
+        """Returns whether the given image file is an Asuka picture.
+
+        Raises `ClassificationError` when no verdict can be
+        given within `self.timeout` seconds.
+        """
+        raise NotImplementedError
+
+
+class GoogleSearchClassifier(BaseClassifier):
+    """Looks the picture up in Google's search by image and
+    checks the words Google uses to describe it.
+
+    The picture must be reachable from Google, so it's written
+    in `MEDIA_ROOT` unless a public URL is given. The HTTP
+    connections are pooled by the module's `session` and reused
+    between lookups.
+    """
+
+    SEARCH_URL = 'https://www.google.com/searchbyimage'
+    EXTRA_QUERY_PARAMS = '&encoded_image=&image_content=&filename=&hl=en'
+    HEADERS = {
+        'User-Agent': (
+            'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:95.0) '
+            'Gecko/20100101 Firefox/95.0'
+        ),
+        'Accept':
+            'text/html',
+    }
+    ATTEMPTS = 3
+    RETRY_DELAY = 1
+    WRONG_WORDS = ('WWE', 'LUCHADORA', 'WRESTLER', 'AYANAMI', 'REI')
+    MANDATORY_WORDS = ('ASUKA', 'アスカ')
+
+    def __init__(self, timeout):
+        super(GoogleSearchClassifier, self).__init__(timeout)
+        self.session = session
+
+    def get_search_url(self, image=None, image_url=None):
+        """Returns the search by image URL of the given picture."""
+        if not image_url:
+            filename = image.name
+            with open(f'{settings.MEDIA_ROOT}/{filename}', 'wb+') as tmp_img:
+                for chunck in image.chunks():
+                    tmp_img.write(chunck)
+            image_url = 'https://{}{}{}'.format(
+                settings.APP_URL, settings.MEDIA_URL, filename
+            )
+        return '{}?image_url={}{}'.format(
+            self.SEARCH_URL, image_url, self.EXTRA_QUERY_PARAMS
+        )
+
+    def classify(self, image=None, image_url=None):
+        deadline = time.monotonic() + self.timeout
+        search_by_image_url = self.get_search_url(image, image_url)
+
+        result = ''
+        for attempt in range(self.ATTEMPTS):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                response = self.session.get(
+                    search_by_image_url,
+                    headers=self.HEADERS,
+                    timeout=remaining
+                )
+            except requests.RequestException:
+                response = None
+            if response is not None and response.ok:
+                soup = BeautifulSoup(response.text, 'html.parser')
+                target = soup.find(
+                    'input', {'aria-label': 'Search', 'name': 'q'}
+                )
+                if target is not None:
+                    result = (target.get('value') or '').upper()
+            if result or attempt == self.ATTEMPTS - 1:
+                break
+            remaining = deadline - time.monotonic()
+            time.sleep(max(min(self.RETRY_DELAY, remaining), 0))
+
+        if not result:
+            raise ClassificationError('Google did not describe the picture.')
+
+        check_1 = any([x in result for x in self.MANDATORY_WORDS])
+        check_2 = any([x in result for x in self.WRONG_WORDS])
+        return check_1 and not check_2
+
+
+class ColorHeuristicClassifier(BaseClassifier):
+    """CPU-only classifier which doesn't need the network.
+
+    It's a heuristic stub: a picture is accepted when enough of its
+    pixels have the saturated red and orange of Asuka's plugsuit
+    and hair.
+    """
+
+    SAMPLE_SIZE = (64, 64)
+    MIN_RED_RATIO = 0.08
+
+    def classify(self, image):
+        position = image.tell()
+        with Image.open(image) as img:
+            img.draft('RGB', self.SAMPLE_SIZE)
+            pixels = list(
+                img.convert('RGB').resize(self.SAMPLE_SIZE).getdata()
+            )
+        image.seek(position)
+        red_pixels = 0
+        for r, g, b in pixels:
+            hue, saturation, value = colorsys.rgb_to_hsv(
+                r / 255, g / 255, b / 255
+            )
+            if (hue < 0.1 or hue > 0.95) and saturation > 0.5 and value > 0.3:
+                red_pixels += 1
+        return red_pixels / len(pixels) >= self.MIN_RED_RATIO
+
+
+@lru_cache(maxsize=None)
+def _load_classifier(path, timeout):
+    return import_string(path)(timeout=timeout)
+
+
+def get_classifier():
+    """Returns the classifier backend set in `ASUKA_CLASSIFIER`."""
+    return _load_classifier(
+        settings.ASUKA_CLASSIFIER, settings.ASUKA_CLASSIFIER_TIMEOUT
+    )
+
+
+def classify_picture(image):
+    """Returns whether the given image file is an Asuka picture,
+    using the cached verdict of similar pictures when possible.
+
+    Raises `ClassificationError` when the classifier can't give
+    a verdict in time, which is not cached.
+    """
+    key = perceptual_hash(image)
+    verdict = verdict_cache.get(key)
+    if verdict is None:
+        verdict = bool(get_classifier().classify(image))
+        verdict_cache.set(key, verdict)
+    return verdict
@@ -0,0 +1,122 @@
+"""Conditional GET utilities.
+
+The validators of list and detail endpoints are computed from the
+`modified` values of the rows the view fetched to serialize, i.e.
+the page of a list, so they cost no query of their own. Requests
+whose validators match are answered with 304 before the rows are
+serialized. Lists only have an ETag, as a removed row doesn't
+change the latest `modified` value.
+
+Buffered likes (see `posts.buffers`) only change `modified` when
+they are flushed.
+"""
+
+# Django
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Utils
+from functools import wraps
+import hashlib
+
+
+class NotModified(Exception):
+    """Raised to answer the request with the given 304 response."""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def get_field_value(instance, field):
+    """Returns the value of the given field path, e.g.
+    `user__profile__modified`, or None when a relation is empty.
+    """
+    for name in field.split('__'):
+        if instance is None:
+            return None
+        instance = getattr(instance, name)
+    return instance
+
+
+def get_validators(request, view_name, rows, fields):
+    """Returns the ETag and the Last-Modified timestamp of the
+    given rows, using the latest value of each given field.
+    """
+    latest = []
+    for field in fields:
+        values = [get_field_value(row, field) for row in rows]
+        latest.append(max((v for v in values if v), default=None))
+    user = request.user
+    raw = '|'.join([
+        view_name,
+        str(user.pk) if user.is_authenticated else '',
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        ','.join(str(row.pk) for row in rows),
+        *[value.isoformat() if value else '' for value in latest],
+    ])
+    etag = 'W/"{}"'.format(hashlib.md5(raw.encode('utf-8')).hexdigest())
+    dates = [value for value in latest if value]
+    last_modified = int(max(dates).timestamp()) if dates else None
+    return etag, last_modified
+
+
+def conditional_on_modified(*fields, detail=False):
+    """Answers GET requests to the decorated view set action with
+    304 when the client has the current version of its rows.
+
+    `fields` are the datetime fields whose latest value tells when
+    the response changed, e.g. `modified` and the `modified` of the
+    related rows which are serialized too. They are read from the
+    instances passed to `get_serializer`, so the related rows must
+    be selected with them.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_method(self, request, *args, **kwargs)
+
+            validators = {}
+            get_serializer = self.get_serializer
+
+            def get_validated_serializer(instance=None, **s_kwargs):
+                rows = list(instance) if s_kwargs.get('many') else [instance]
+                etag, last_modified = get_validators(
+                    request,
+                    '{}.{}'.format(self.basename, self.action),
+                    rows,
+                    fields or ('modified',)
+                )
+                if not detail:
+                    last_modified = None
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified
+                )
+                if response is not None:
+                    raise NotModified(
+                        set_validators(response, etag, last_modified)
+                    )
+                validators.update(etag=etag, last_modified=last_modified)
+                return get_serializer(instance, **s_kwargs)
+
+            self.get_serializer = get_validated_serializer
+            try:
+                response = view_method(self, request, *args, **kwargs)
+            except NotModified as not_modified:
+                return not_modified.response
+            finally:
+                del self.get_serializer
+            if validators and response.status_code == 200:
+                set_validators(response, **validators)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,106 @@
+"""Denormalized counters reconciliation.
+
+Counter columns like `likes_quantity` are recomputed from the rows
+they count. Each counter is walked in chunks of primary keys, so
+memory stays bounded, and only the rows which drifted are written.
+
+Counters buffered by `posts.buffers` are recomputed without their
+pending deltas, as the flusher adds them afterwards.
+"""
+
+# Django
+from django.db import transaction
+from django.db.models import Count
+
+# Models
+from posts.models import Comment, Post
+from users.models import Follow, Profile
+
+# Utils
+from posts import buffers
+from collections import namedtuple
+
+
+Counter = namedtuple(
+    'Counter', ('model', 'field', 'related_model', 'fk', 'key', 'buffered'),
+    defaults=('pk', False)
+)
+
+Drift = namedtuple('Drift', ('checked', 'drifted', 'total'))
+
+
+def get_counters():
+    """Returns the reconciled counters keyed by name."""
+    return {
+        'post.likes_quantity': Counter(
+            Post, 'likes_quantity', Post.likes.through, 'post',
+            buffered=True
+        ),
+        'post.comments_quantity': Counter(
+            Post, 'comments_quantity', Comment, 'post'
+        ),
+        'comment.likes_quantity': Counter(
+            Comment, 'likes_quantity', Comment.likes.through, 'comment',
+            buffered=True
+        ),
+        'profile.followers_quantity': Counter(
+            Profile, 'followers_quantity', Follow, 'followed', key='user'
+        ),
+        'profile.following_quantity': Counter(
+            Profile, 'following_quantity', Follow, 'follower', key='user'
+        ),
+    }
+
+
+def reconcile_counter(counter, batch_size=1000, dry_run=False, report=None):
+    """Recomputes the given counter and fixes the rows which drifted.
+
+    Each chunk is locked while it's counted and updated, so changes
+    made meanwhile by requests aren't overwritten. `report` is called
+    with the pk, the stored and the real value of each drifted row.
+
+    Returns a `Drift` with the quantity of checked and drifted rows
+    and the sum of the absolute differences.
+    """
+    model, field = counter.model, counter.field
+    checked = drifted = total = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                model.objects.select_for_update()
+                .filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', counter.key, field)[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            counts = dict(
+                counter.related_model.objects
+                .filter(**{f'{counter.fk}__in': [key for _, key, _ in rows]})
+                .order_by()
+                .values_list(counter.fk)
+                .annotate(quantity=Count('pk'))
+            )
+            pending = {}
+            if counter.buffered:
+                pending = buffers.get_pending_deltas(
+                    model, [pk for pk, _, _ in rows]
+                )
+
+            changed = []
+            for pk, key, stored in rows:
+                quantity = counts.get(key, 0) - pending.get(pk, 0)
+                if stored != quantity:
+                    total += abs(stored - quantity)
+                    changed.append(model(pk=pk, **{field: quantity}))
+                    if report is not None:
+                        report(pk, stored, quantity)
+            if changed and not dry_run:
+                model.objects.bulk_update(
+                    changed, [field], batch_size=batch_size
+                )
+            checked += len(rows)
+            drifted += len(changed)
+    return Drift(checked, drifted, total)
@@ -0,0 +1,292 @@
+"""Image processing utilities.
+
+Uploaded images are stored as they come and rendered afterwards
+in a fixed set of sizes by a pool of workers, so the request which
+uploaded them doesn't have to wait for it.
+`IMAGE_PROCESSING_WORKERS` sets the size of the pool, with 0 the
+images are processed synchronously.
+
+Rendered files are named by the SHA-256 of their content, so
+identical renditions are stored once and their URLs never change
+content. The `IMAGE_BLOB_MODEL` model, e.g. `posts.ImageBlob`, counts
+the references to each stored file and keeps the name the storage
+saved it under, as storages like Cloudinary's may change it.
+"""
+
+# Django
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Models
+from utils.models import ImageStatus
+
+# Utils
+from utils import caching
+import hashlib
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    """Returns the process-wide image processing pool."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='image-processing'
+        )
+    return _executor
+
+
+def run_in_background(func, *args):
+    """Runs the function in the image processing pool once the
+    current transaction is committed, or right away when there
+    are no workers.
+    """
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        func(*args)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_run_in_worker, func, *args)
+    )
+
+
+def _run_in_worker(func, *args):
+    """Runs the function closing the worker's
+    database connection afterwards.
+    """
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Background task %s failed.', func.__name__)
+    finally:
+        close_old_connections()
+
+
+def reduce_image(image, height=720, width=1280):
+    """Opens the given image and fits it in the given size."""
+    img = Image.open(image)
+    img = img.convert('RGB')
+    img.thumbnail(
+        (height, width) if img.width < img.height else (width, height)
+    )
+    return img
+
+
+Rendition = namedtuple('Rendition', ('width', 'height', 'quality'))
+
+THUMBNAIL = 'thumbnail'
+MEDIUM = 'medium'
+FULL = 'full'
+
+POST_IMAGE_RENDITIONS = {
+    THUMBNAIL: Rendition(width=320, height=180, quality=65),
+    MEDIUM: Rendition(width=640, height=360, quality=70),
+    FULL: Rendition(width=1280, height=720, quality=70),
+}
+
+PROFILE_PICTURE_RENDITIONS = {
+    THUMBNAIL: Rendition(width=96, height=96, quality=60),
+    MEDIUM: Rendition(width=300, height=300, quality=60),
+    FULL: Rendition(width=600, height=600, quality=60),
+}
+
+ImageFormat = namedtuple(
+    'ImageFormat', ('extension', 'pil_format', 'content_type')
+)
+
+JPEG = ImageFormat('jpeg', 'JPEG', 'image/jpeg')
+
+# Every rendition is encoded in each of these formats which
+# are supported by the installed Pillow. JPEG is always used
+# as it's the format understood by every client.
+IMAGE_FORMATS = (
+    JPEG,
+    ImageFormat('webp', 'WEBP', 'image/webp'),
+    ImageFormat('avif', 'AVIF', 'image/avif'),
+)
+
+
+def get_image_formats():
+    """Returns the image formats Pillow can encode."""
+    Image.init()
+    return [f for f in IMAGE_FORMATS if f.pil_format in Image.SAVE]
+
+
+def render_image(image, renditions):
+    """Decodes the given image once and returns a dict with each
+    rendition name and a dict of its bytes encoded in each format.
+
+    The renditions are produced from the biggest to the smallest,
+    each one is downscaled from the previous one.
+    """
+    img = Image.open(image)
+    img = img.convert('RGB')
+    rendered = {}
+    for name, rendition in sorted(
+        renditions.items(),
+        key=lambda item: item[1].width * item[1].height,
+        reverse=True
+    ):
+        img = img.copy()
+        img.thumbnail(
+            (rendition.height, rendition.width)
+            if img.width < img.height
+            else (rendition.width, rendition.height)
+        )
+        rendered[name] = {}
+        for image_format in get_image_formats():
+            img_io = BytesIO()
+            img.save(
+                img_io, image_format.pil_format, quality=rendition.quality
+            )
+            rendered[name][image_format.extension] = img_io.getvalue()
+    return rendered
+
+
+def process_image(instance, field_name, renditions):
+    """Schedules the rendering of an already stored image.
+
+    The image is replaced by its `full` JPEG rendition, and the
+    `<field>_renditions` field stores, for each rendition, a list
+    of `[extension, file name]` pairs sorted from the smallest
+    to the biggest file. The `<field>_status` field of the instance is set to
+    'ready' or 'failed' when it's done.
+    """
+    run_in_background(
+        render_stored_image, type(instance), instance.pk,
+        field_name, renditions
+    )
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        instance.refresh_from_db(fields=[
+            field_name,
+            f'{field_name}_status',
+            f'{field_name}_renditions'
+        ])
+
+
+def render_stored_image(model, pk, field_name, renditions):
+    """Replaces the stored image with its renditions.
+
+    Returns whether the renditions were stored.
+    """
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return False
+    status_field = f'{field_name}_status'
+    field = getattr(instance, field_name)
+    storage = field.storage
+    original_name = field.name
+    previous = getattr(instance, f'{field_name}_renditions') or {}
+    stored = {}
+    try:
+        with field.open('rb') as original:
+            rendered = render_image(original, renditions)
+        for name, encoded in rendered.items():
+            stored[name] = []
+            for extension, content in sorted(
+                encoded.items(), key=lambda item: len(item[1])
+            ):
+                stored[name].append([
+                    extension,
+                    store_image_blob(instance, field, extension, content)
+                ])
+    except Exception:
+        logger.exception('Could not process %s %s image.', model.__name__, pk)
+        release_renditions(storage, stored)
+        model.objects.filter(pk=pk).update(
+            **{status_field: ImageStatus.FAILED, 'modified': timezone.now()}
+        )
+        return False
+
+    # The image could have been replaced while it was processed.
+    updated = model.objects.filter(
+        pk=pk, **{field_name: original_name}
+    ).update(**{
+        field_name: dict(stored[FULL])[JPEG.extension],
+        status_field: ImageStatus.READY,
+        f'{field_name}_renditions': stored,
+        'modified': timezone.now(),
+    })
+    if updated:
+        if hasattr(instance, 'get_cache_scopes'):
+            caching.invalidate_instance(instance)
+        release_renditions(storage, previous)
+        # The image field shares the reference of its full rendition.
+        if not any(
+            file_name == original_name
+            for files in previous.values() for _, file_name in files
+        ):
+            release_image_blob(storage, original_name)
+    else:
+        release_renditions(storage, stored)
+    return bool(updated)
+
+
+def get_image_blob_model():
+    """Returns the model set in `IMAGE_BLOB_MODEL`."""
+    return apps.get_model(settings.IMAGE_BLOB_MODEL)
+
+
+def store_image_blob(instance, field, extension, content):
+    """Stores the content under its SHA-256 unless it's
+    already stored, and returns the stored file name.
+    """
+    ImageBlob = get_image_blob_model()
+    digest = hashlib.sha256(content).hexdigest()
+    name = field.field.generate_filename(instance, f'{digest}.{extension}')
+    storage = field.storage
+    with transaction.atomic():
+        blob, created = ImageBlob.objects.select_for_update().get_or_create(
+            name=name
+        )
+        if not created:
+            ImageBlob.objects.filter(pk=blob.pk).update(
+                references=F('references') + 1
+            )
+        if created or not storage.exists(blob.stored_name):
+            blob.stored_name = storage.save(name, ContentFile(content))
+            ImageBlob.objects.filter(pk=blob.pk).update(
+                stored_name=blob.stored_name
+            )
+    return blob.stored_name
+
+
+def release_image_blob(storage, name):
+    """Drops a reference to the stored file and deletes it when
+    nothing references it. Files which aren't image blobs, like
+    the uploaded originals, are deleted right away.
+    """
+    ImageBlob = get_image_blob_model()
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update().filter(
+            stored_name=name
+        ).first()
+        if blob is not None and blob.references > 1:
+            ImageBlob.objects.filter(pk=blob.pk).update(
+                references=F('references') - 1
+            )
+            return
+        if blob is not None:
+            blob.delete()
+        storage.delete(name)
+
+
+def release_renditions(storage, renditions):
+    """Releases every stored file of the given renditions."""
+    for files in renditions.values():
+        for _, file_name in files:
+            release_image_blob(storage, file_name)
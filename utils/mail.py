@@ -0,0 +1,180 @@
+"""Outbound email queue.
+
+Emails are stored as `QueuedEmail` rows when they are enqueued, so
+the requests which send them don't wait for the mail provider.
+`send_queued_emails` (run by the `send_queued_emails` management
+command) sends the due emails in batches through one connection,
+which is reused by the whole batch.
+
+An email whose delivery fails is retried after
+`EMAIL_QUEUE_RETRY_DELAY` seconds, doubled on every attempt, and is
+marked as failed after `EMAIL_QUEUE_MAX_ATTEMPTS` attempts.
+
+The bodies of transactional emails are rendered with `render_email`
+from the `emails/<name>.txt` and `emails/<name>.html` templates,
+which are compiled once per process.
+"""
+
+# Django
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+
+# Models
+from users.models import QueuedEmail
+
+# Utils
+from utils.models import EmailStatus
+from collections import namedtuple
+from datetime import timedelta
+from functools import lru_cache
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+Delivery = namedtuple('Delivery', ('sent', 'retried', 'failed'))
+
+
+@lru_cache(maxsize=None)
+def get_email_templates(name):
+    """Returns the compiled text and HTML templates of the email."""
+    return (
+        get_template(f'emails/{name}.txt'),
+        get_template(f'emails/{name}.html'),
+    )
+
+
+def render_email(name, context):
+    """Returns the text and HTML bodies of the email
+    rendered with the given context.
+    """
+    text_template, html_template = get_email_templates(name)
+    return text_template.render(context), html_template.render(context)
+
+
+def enqueue_email(subject, body, to, from_email=None, html_body=''):
+    """Stores an email to be sent by the mail worker."""
+    return QueuedEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+        next_attempt=timezone.now()
+    )
+
+
+def get_retry_delay(attempts):
+    """Returns the seconds to wait after the given failed attempts."""
+    return settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def build_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        email.subject,
+        email.body,
+        email.from_email,
+        email.to,
+        connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def claim_emails(batch_size):
+    """Returns the due emails and postpones them by
+    `EMAIL_QUEUE_LEASE` seconds, so other workers skip them
+    while they are sent.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailStatus.PENDING, next_attempt__lte=now)
+            .order_by('next_attempt', 'pk')[:batch_size]
+        )
+        QueuedEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(
+            next_attempt=now + timedelta(seconds=settings.EMAIL_QUEUE_LEASE),
+            modified=now
+        )
+    return emails
+
+
+def _record_failure(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+        email.status = EmailStatus.FAILED
+    else:
+        email.next_attempt = timezone.now() + timedelta(
+            seconds=get_retry_delay(email.attempts)
+        )
+    email.save(update_fields=[
+        'attempts', 'last_error', 'status', 'next_attempt', 'modified'
+    ])
+
+
+def _reconnect(connection):
+    """Opens the connection again, returns the error
+    which prevented it or None.
+    """
+    try:
+        connection.close()
+        connection.open()
+    except Exception as error:
+        logger.warning('The mail connection could not be opened: %s', error)
+        return error
+    return None
+
+
+def send_queued_emails(batch_size=None):
+    """Sends a batch of the due emails through one connection.
+
+    The emails which weren't tried because the connection couldn't
+    be opened count it as a failed attempt, so they are retried
+    with the same backoff.
+
+    Returns a `Delivery` with the quantity of sent, retried
+    and failed emails.
+    """
+    emails = claim_emails(batch_size or settings.EMAIL_QUEUE_BATCH_SIZE)
+    if not emails:
+        return Delivery(0, 0, 0)
+
+    sent, failures = [], []
+    connection = get_connection()
+    connection_error = _reconnect(connection)
+    tried = 0
+    while connection_error is None and tried < len(emails):
+        email = emails[tried]
+        tried += 1
+        try:
+            if not connection.send_messages([build_message(email)]):
+                raise RuntimeError('The email was not sent.')
+        except Exception as error:
+            logger.warning('Email %s was not sent: %s', email.pk, error)
+            failures.append((email, error))
+            # The connection may be broken after an error.
+            connection_error = _reconnect(connection)
+        else:
+            sent.append(email.pk)
+    connection.close()
+    failures += [(email, connection_error) for email in emails[tried:]]
+
+    QueuedEmail.objects.filter(pk__in=sent).update(
+        status=EmailStatus.SENT, modified=timezone.now()
+    )
+    retried = failed = 0
+    for email, error in failures:
+        _record_failure(email, error)
+        if email.status == EmailStatus.FAILED:
+            failed += 1
+        else:
+            retried += 1
+    return Delivery(len(sent), retried, failed)
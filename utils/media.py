@@ -0,0 +1,194 @@
+"""Media serving utilities.
+
+Files are sent without being read by Python when possible: with
+`MEDIA_ACCEL_REDIRECT` set, the response only carries an
+`X-Accel-Redirect` header and nginx sends the file. Under WSGI the
+open file is handed to the server's `wsgi.file_wrapper`, which
+uses `sendfile` (e.g. gunicorn).
+
+ASGI servers have no `sendfile` and would iterate a streamed file
+in the event loop, so under ASGI the file is read in the view's
+thread instead. That's only meant for development, production
+must set `MEDIA_ACCEL_REDIRECT`, see `askallery.asgi`.
+
+Responses carry `ETag` and `Last-Modified`, answer conditional
+requests with 304 and support single `Range` requests. Files named
+by their content hash never change, so they are cached forever.
+"""
+
+# Django
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+# Utils
+import mimetypes
+import os
+import re
+import stat
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CONTENT_ADDRESSED_RE = re.compile(r'(^|/)[0-9a-f]{64}\.\w+$')
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+class FileRange:
+    """File-like object which reads only `length`
+    bytes of the given file from `start`.
+
+    It exposes the file descriptor, so `sendfile` sends
+    the range straight from the current file offset.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Returns the `(start, length)` of a single bytes range,
+    None when the header must be ignored, or raises
+    ValueError when the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = min(int(last), size)
+        if length == 0:
+            raise ValueError('Unsatisfiable range.')
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Unsatisfiable range.')
+    return start, end - start + 1
+
+
+def _if_range_matches(request, etag, last_modified):
+    """Returns whether the range can be served according
+    to the `If-Range` header.
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def serve_file(request, path, document_root):
+    """Serves the file at `path` relative to `document_root`.
+
+    Under WSGI the file is streamed with `sendfile`, under ASGI it's
+    read in the view's thread, unless nginx sends it.
+    """
+    try:
+        full_path = safe_join(document_root, path)
+        file_stat = os.stat(full_path)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404('File not found.')
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404('File not found.')
+
+    size = file_stat.st_size
+    last_modified = int(file_stat.st_mtime)
+    etag = '"{:x}-{:x}"'.format(file_stat.st_mtime_ns, size)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        return _set_validators(response, path, etag, last_modified)
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(size)
+            return response
+
+    accel_prefix = settings.MEDIA_ACCEL_REDIRECT
+    if accel_prefix:
+        # nginx handles the ranges and conditional requests itself.
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix + path.lstrip('/')
+    else:
+        start, length = byte_range or (0, size)
+        status = 200 if byte_range is None else 206
+        if isinstance(request, ASGIRequest):
+            with open(full_path, 'rb') as file:
+                file.seek(start)
+                response = HttpResponse(
+                    file.read(length), status=status,
+                    content_type=content_type
+                )
+        elif byte_range is None:
+            response = FileResponse(
+                open(full_path, 'rb'), content_type=content_type
+            )
+        else:
+            response = FileResponse(
+                FileRange(open(full_path, 'rb'), start, length),
+                status=status,
+                content_type=content_type
+            )
+        response['Content-Length'] = length
+        if byte_range is not None:
+            response['Content-Range'] = 'bytes {}-{}/{}'.format(
+                start, start + length - 1, size
+            )
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    return _set_validators(response, path, etag, last_modified)
+
+
+def _set_validators(response, path, etag, last_modified):
+    """Sets the validators and, for content-addressed
+    files, the immutable caching headers.
+    """
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if CONTENT_ADDRESSED_RE.search(path):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    return response
+
+
+def serve_media(request, path):
+    """Serves the files stored in `MEDIA_ROOT`."""
+    return serve_file(request, path, settings.MEDIA_ROOT)
@@ -35,3 +35,27 @@ class AskalleryModel(models.Model):
 
         get_latest_by = 'created'
         ordering = ('-created', '-modified')
+
+
+class ImageStatus(models.TextChoices):
+    """Processing status of an uploaded image."""
+
+    PROCESSING = 'processing', 'processing'
+    READY = 'ready', 'ready'
+    FAILED = 'failed', 'failed'
+
+
+class ClassificationStatus(models.TextChoices):
+    """Classification status of an uploaded picture."""
+
+    PENDING = 'pending', 'pending'
+    APPROVED = 'approved', 'approved'
+    REJECTED = 'rejected', 'rejected'
+
+
+class EmailStatus(models.TextChoices):
+    """Delivery status of a queued email."""
+
+    PENDING = 'pending', 'pending'
+    SENT = 'sent', 'sent'
+    FAILED = 'failed', 'failed'
@@ -0,0 +1,176 @@
+"""Pagination utilities."""
+
+# Django
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# REST Framework
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Utils
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+
+class CreatedCursorPagination(LimitOffsetPagination):
+    """Keyset pagination over the `(created, pk)` pair.
+
+    Pages are fetched with `WHERE (created, pk) < (cursor)` instead
+    of an `OFFSET`, so every page costs the same no matter how deep
+    the client goes, and no `COUNT(*)` query is performed.
+
+    Clients that send the `offset` or `ordering` query params get the
+    regular limit/offset pagination, which includes `count`.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+    ordering = ('-created', '-pk')
+    max_limit = 100
+
+    def use_offset(self, request):
+        """Returns whether the client asked
+        for limit/offset pagination.
+        """
+        return (
+            self.offset_query_param in request.query_params
+            or 'ordering' in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Returns the page which starts right after the given cursor."""
+        self.offset_mode = self.use_offset(request)
+        if self.offset_mode:
+            return super(CreatedCursorPagination, self).paginate_queryset(
+                queryset, request, view
+            )
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            created, pk = cursor
+            queryset = queryset.filter(
+                Q(created__lt=created) | Q(created=created, pk__lt=pk)
+            )
+
+        # Fetch one extra row to know if there is a next page.
+        results = list(queryset[:self.limit + 1])
+        self.has_next = len(results) > self.limit
+        self.page = results[:self.limit]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.offset_mode:
+            return super(CreatedCursorPagination, self).get_paginated_response(
+                data
+            )
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        if getattr(self, 'offset_mode', False):
+            return super(
+                CreatedCursorPagination, self
+            ).get_paginated_response_schema(schema)
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.offset_mode:
+            return super(CreatedCursorPagination, self).get_next_link()
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(last)
+        )
+
+    def get_previous_link(self):
+        if self.offset_mode:
+            return super(CreatedCursorPagination, self).get_previous_link()
+        return None
+
+    def encode_cursor(self, instance):
+        """Returns an opaque cursor pointing at the given instance."""
+        raw = '{}|{}'.format(instance.created.isoformat(), instance.pk)
+        return urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        """Returns the `(created, pk)` pair of the
+        requested cursor or None for the first page.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            created, pk = raw.split('|')
+            created = parse_datetime(created)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created, pk
+
+
+class UncountedLimitOffsetPagination(LimitOffsetPagination):
+    """Limit/offset pagination without the `COUNT(*)` query.
+
+    One extra row is fetched to know if there is a next page,
+    so the responses have no `count`.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        self.request = request
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        schema = super(
+            UncountedLimitOffsetPagination, self
+        ).get_paginated_response_schema(schema)
+        del schema['properties']['count']
+        return schema
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
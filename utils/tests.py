@@ -4,6 +4,7 @@
 from users.models import User, Profile
 
 # Utils
+from utils.classification import BaseClassifier
 from PIL import Image
 import tempfile
 
@@ -84,9 +85,19 @@ def create_users(**data):
     }
 
 
-def create_image():
+class FakeClassifier(BaseClassifier):
+    """Classifier used by the tests instead of the Google lookups.
+
+    Every picture is an Asuka picture.
+    """
+
+    def classify(self, image):
+        return True
+
+
+def create_image(size=(200, 200)):
     with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as f:
-        image = Image.new('RGB', (200, 200), 'white')
+        image = Image.new('RGB', size, 'white')
         image.save(f, 'PNG')
 
     return open(f.name, mode='rb')